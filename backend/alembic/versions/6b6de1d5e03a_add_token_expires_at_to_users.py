@@ -0,0 +1,28 @@
+"""Add token_expires_at to users
+
+Revision ID: 6b6de1d5e03a
+Revises: af82720bccdc
+Create Date: 2026-10-18 13:41:05.218377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6b6de1d5e03a'
+down_revision: Union[str, None] = 'af82720bccdc'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('token_expires_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'token_expires_at')
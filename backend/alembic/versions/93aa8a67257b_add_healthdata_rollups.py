@@ -0,0 +1,48 @@
+"""Add healthdata_rollups table
+
+Revision ID: 93aa8a67257b
+Revises: 153f9eda6869
+Create Date: 2026-10-18 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '93aa8a67257b'
+down_revision: Union[str, None] = '153f9eda6869'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('healthdata_rollups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('metric_type', sa.String(), nullable=False),
+    sa.Column('granularity', sa.String(), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('value_count', sa.Integer(), nullable=False),
+    sa.Column('value_sum', sa.Float(), nullable=True),
+    sa.Column('value_min', sa.Float(), nullable=True),
+    sa.Column('value_max', sa.Float(), nullable=True),
+    sa.Column('bp_count', sa.Integer(), nullable=False),
+    sa.Column('systolic_sum', sa.Float(), nullable=True),
+    sa.Column('diastolic_sum', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'metric_type', 'granularity', 'bucket_start', name='uq_rollup_user_metric_bucket')
+    )
+    op.create_index(op.f('ix_healthdata_rollups_id'), 'healthdata_rollups', ['id'], unique=False)
+    op.create_index('ix_rollup_user_granularity_bucket', 'healthdata_rollups', ['user_id', 'granularity', 'bucket_start'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_rollup_user_granularity_bucket', table_name='healthdata_rollups')
+    op.drop_index(op.f('ix_healthdata_rollups_id'), table_name='healthdata_rollups')
+    op.drop_table('healthdata_rollups')
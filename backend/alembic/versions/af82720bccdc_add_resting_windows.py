@@ -0,0 +1,41 @@
+"""Add resting_windows feature table
+
+Revision ID: af82720bccdc
+Revises: 93aa8a67257b
+Create Date: 2026-10-18 11:02:17.540913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'af82720bccdc'
+down_revision: Union[str, None] = '93aa8a67257b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('resting_windows',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('window_start', sa.DateTime(), nullable=False),
+    sa.Column('heart_rate', sa.Float(), nullable=False),
+    sa.Column('spo2', sa.Float(), nullable=False),
+    sa.Column('systolic_bp', sa.Float(), nullable=False),
+    sa.Column('diastolic_bp', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'window_start', name='uq_resting_window_user_start')
+    )
+    op.create_index(op.f('ix_resting_windows_id'), 'resting_windows', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_resting_windows_id'), table_name='resting_windows')
+    op.drop_table('resting_windows')
@@ -0,0 +1,58 @@
+# backend/backfill_rollups.py
+
+import asyncio
+import sys
+from datetime import timedelta
+
+from sqlalchemy import func
+from sqlalchemy.future import select
+
+from database import async_session
+from models import HealthData, User
+from services.health_rollups import refresh_rollups
+from services.feature_store import seed_resting_windows
+from services.response_cache import response_cache
+
+CHUNK_DAYS = 30
+
+
+async def backfill(user_ids=None):
+    async with async_session() as db:
+        query = select(User.id)
+        if user_ids:
+            query = query.where(User.id.in_(user_ids))
+        ids = (await db.execute(query)).scalars().all()
+
+        for user_id in ids:
+            first_ts, last_ts = (
+                await db.execute(
+                    select(func.min(HealthData.timestamp), func.max(HealthData.timestamp))
+                    .where(HealthData.user_id == user_id)
+                )
+            ).one()
+            if not first_ts:
+                continue
+
+            written = 0
+            cursor = first_ts
+            while cursor <= last_ts:
+                chunk_end = min(cursor + timedelta(days=CHUNK_DAYS), last_ts + timedelta(seconds=1))
+                written += await refresh_rollups(db, user_id, cursor, chunk_end)
+                await db.commit()
+                cursor = chunk_end
+
+            windows = await seed_resting_windows(db, user_id, force=True)
+            await db.commit()
+            # Rollups and windows changed for all of history. Reaches the API
+            # through the disk/redis backends; memory caches die with the
+            # API process, so restart it after a backfill.
+            await response_cache.invalidate_user(user_id)
+
+            print(f"✅ Rolled up user {user_id}: {written} buckets, {windows} resting windows")
+
+
+# Run manually after applying the rollup / resting window migrations:
+#   python backfill_rollups.py            (all users)
+#   python backfill_rollups.py 3 7        (specific user ids)
+if __name__ == "__main__":
+    asyncio.run(backfill([int(a) for a in sys.argv[1:]] or None))
@@ -28,6 +28,8 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import declarative_base, sessionmaker
 import os
 
+from services.db_metrics import TimedQueuePool, db_metrics
+
 
 # Get database URL from environment variable
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -44,11 +46,40 @@ if DATABASE_URL.startswith("postgresql://"):
         1
     )
 
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=False,
-    future=True,
-)
+# Pool limits are per process: the API, and each training worker, open
+# their own engine against the same server connection limit.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# Postgres only. Use a prepared statement cache size of 0 behind pgbouncer
+# in transaction mode.
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+DB_PREPARED_STATEMENT_CACHE_SIZE = int(os.getenv("DB_PREPARED_STATEMENT_CACHE_SIZE", "100"))
+
+engine_options = {"echo": False, "future": True}
+
+# SQLite (local dev) keeps SQLAlchemy's default pool for its driver
+if not DATABASE_URL.startswith("sqlite"):
+    engine_options.update(
+        poolclass=TimedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+
+if DATABASE_URL.startswith("postgresql+asyncpg://"):
+    engine_options["connect_args"] = {
+        "server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)},
+        "prepared_statement_cache_size": DB_PREPARED_STATEMENT_CACHE_SIZE,
+    }
+
+engine = create_async_engine(DATABASE_URL, **engine_options)
+db_metrics.instrument(engine)
 
 async_session = sessionmaker(
     bind=engine,
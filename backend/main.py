@@ -1,17 +1,43 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import os
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.future import select
-from database import Base, engine, async_session
-from models import User
+from database import Base, engine
 from routers import auth, healthdata, google_auth,user
 from routers.google_health import router as google_health_router
-from services.google_sync import sync_google_fit_data
+from services.sync_scheduler import sync_scheduler
+from services.training_executor import training_executor
+from services.http_client import start_http_client, close_http_client
+from services.db_metrics import db_metrics
+from services.etags import apply_cache_headers
+from services.response_cache import response_cache
+from services.user_cache import user_cache
 from routers import activity  
 from routers import personalized_ai
-from services.train_user_model import train_user_model
-import os
+from routers import export
+from routers import dashboard
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
 
-app = FastAPI()
+    # Shared pooled client for every Google call (sync, OAuth, devices)
+    await start_http_client()
+
+    # Fleet sync + first-time training run in the background so the app
+    # accepts traffic (and answers /health) immediately.
+    sync_scheduler.start()
+
+    yield
+
+    await sync_scheduler.stop()
+    await training_executor.shutdown()
+    await close_http_client()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -25,6 +51,36 @@ app.add_middleware(
 
 )
 
+DB_SLOW_REQUEST_MS = float(os.getenv("DB_SLOW_REQUEST_MS", "1000"))
+
+
+@app.middleware("http")
+async def db_request_metrics(request: Request, call_next):
+    stats, token = db_metrics.begin_request()
+    try:
+        response = await call_next(request)
+    finally:
+        db_metrics.end_request(token)
+
+    # Streamed bodies (exports) run their queries after this point
+    response.headers["Server-Timing"] = stats.server_timing()
+    db_ms = (stats.query_seconds + stats.checkout_wait_seconds) * 1000
+    if db_ms > DB_SLOW_REQUEST_MS:
+        print(
+            f" Slow DB request {request.method} {request.url.path}: {stats.queries} queries, "
+            f"{stats.query_seconds * 1000:.0f} ms in queries, {stats.checkout_wait_seconds * 1000:.0f} ms waiting for connections"
+        )
+    return response
+
+
+@app.middleware("http")
+async def http_cache_headers(request: Request, call_next):
+    # ETags are computed by the read routes' etag_validator dependency
+    response = await call_next(request)
+    apply_cache_headers(request, response)
+    return response
+
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(healthdata.router)
@@ -35,6 +91,8 @@ app.include_router(google_health_router)
 app.include_router(user.router)
 app.include_router(activity.router)
 app.include_router(personalized_ai.router, prefix="", tags=["personalized_ai"]) 
+app.include_router(export.router, tags=["export"])
+app.include_router(dashboard.router, tags=["dashboard"])
 
 @app.get("/")
 def root():
@@ -42,37 +100,19 @@ def root():
 
 
 
-@app.on_event("startup")
-async def startup():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+@app.get("/sync/status")
+async def sync_status():
+    return sync_scheduler.status()
+
+
+@app.get("/db/pool")
+async def db_pool_status():
+    return db_metrics.status(engine)
+
 
-    async with async_session() as db:
-        result = await db.execute(select(User))
-        users = result.scalars().all()
-
-        MODEL_BASE = os.path.join(os.path.abspath(os.path.dirname(__file__)),"ml_models", "personalized", "users")
-
-        for user in users:
-            if user.access_token:
-                try:
-                    # 1) Sync Google Fit
-                    await sync_google_fit_data(user, db)
-                    print(f" Synced data for {user.email}")
-
-                    # 2) Train only if model missing (first-time setup)
-                    user_folder = os.path.join(MODEL_BASE, f"user_{user.id}")
-                    model_path = os.path.join(user_folder, "unsupervised_model.pkl")
-                    scaler_path = os.path.join(user_folder, "scaler.pkl")
-
-                    if not (os.path.exists(model_path) and os.path.exists(scaler_path)):
-                        await train_user_model(user.id, db)
-                        print(f" Trained first personalized model for {user.email}")
-                    else:
-                        print(f" Model already exists for {user.email}, skipping training")
-                        
-                except Exception as e:
-                    print(f" Failed to sync/train for {user.email}: {e}")
+@app.get("/cache/status")
+async def cache_status():
+    return {"responses": response_cache.stats(), "users": user_cache.stats()}
 
 
 @app.api_route("/health", methods=["GET", "HEAD"])
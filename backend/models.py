@@ -29,6 +29,7 @@ class User(Base):
     last_fit_sync_at = Column(DateTime, nullable=True)  # UTC naive datetime
     access_token = Column(String, nullable=True)
     refresh_token = Column(String, nullable=True)
+    token_expires_at = Column(DateTime, nullable=True)  # UTC naive; None = unknown
     health_data = relationship("HealthData", back_populates="user")
     sleep_sessions = relationship("SleepSession", back_populates="user", cascade="all, delete-orphan")
     activities = relationship("ActivityLog", back_populates="user", cascade="all, delete-orphan")
@@ -90,3 +91,55 @@ class ActivityLog(Base):
     activity_type = Column(String, nullable=False)
 
     user = relationship("User", back_populates="activities")
+
+
+class HealthDataRollup(Base):
+    __tablename__ = "healthdata_rollups"
+    __table_args__ = (
+        UniqueConstraint("user_id", "metric_type", "granularity", "bucket_start", name="uq_rollup_user_metric_bucket"),
+        Index("ix_rollup_user_granularity_bucket", "user_id", "granularity", "bucket_start"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    metric_type = Column(String, nullable=False)
+    granularity = Column(String, nullable=False)      # "hour" | "day"
+    bucket_start = Column(DateTime, nullable=False)   # UTC naive, aligned to IST hours/days
+    value_count = Column(Integer, nullable=False, default=0)
+    value_sum = Column(Float, nullable=True)
+    value_min = Column(Float, nullable=True)
+    value_max = Column(Float, nullable=True)
+    bp_count = Column(Integer, nullable=False, default=0)
+    systolic_sum = Column(Float, nullable=True)
+    diastolic_sum = Column(Float, nullable=True)
+
+
+class RestingWindow(Base):
+    """Complete 5-minute resting feature window (what the personalized models train/score on)."""
+    __tablename__ = "resting_windows"
+    __table_args__ = (
+        UniqueConstraint("user_id", "window_start", name="uq_resting_window_user_start"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    window_start = Column(DateTime, nullable=False)  # UTC naive, 5-minute aligned
+    heart_rate = Column(Float, nullable=False)       # mean
+    spo2 = Column(Float, nullable=False)             # min
+    systolic_bp = Column(Float, nullable=False)      # max
+    diastolic_bp = Column(Float, nullable=False)     # max
+
+
+class SyncCheckpoint(Base):
+    """Per-stream Google Fit watermark: data for this stream is complete up to synced_through."""
+    __tablename__ = "sync_checkpoints"
+    __table_args__ = (
+        UniqueConstraint("user_id", "metric_type", name="uq_sync_checkpoint_user_metric"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    metric_type = Column(String, nullable=False)       # DATA_TYPES key, "activity" or "sessions"
+    synced_through = Column(DateTime, nullable=True)   # UTC naive
+    last_error = Column(String, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow)
@@ -4,32 +4,32 @@ from sqlalchemy.future import select
 from typing import List
 from datetime import datetime, timedelta
 from database import get_db
-from models import User, ActivityLog
+from models import ActivityLog
+from services.user_cache import CachedUser, get_user_by_user_email
+from services.etags import etag_validator
 
 router = APIRouter()
 
-@router.get("/activity-logs")
+@router.get("/activity-logs", dependencies=[Depends(etag_validator(get_user_by_user_email, rolling=True))])
 async def get_activity_logs(
-    user_email: str = Query(...),
+    user: CachedUser = Depends(get_user_by_user_email),
     days: int = Query(7),
     db: AsyncSession = Depends(get_db)
 ):
-    # Fetch user by email
-    result = await db.execute(select(User).where(User.email == user_email))
-    user = result.scalars().first()
+    return await activity_logs(db, user.id, days, datetime.utcnow())
 
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
 
+async def activity_logs(db: AsyncSession, user_id: int, days: int, now: datetime):
+    """Activities that fall inside the `days` days before now (UTC naive)."""
     # Calculate date range
-    end_time = datetime.utcnow()
+    end_time = now
     start_time = end_time - timedelta(days=days)
 
     # Fetch activities
     result = await db.execute(
         select(ActivityLog)
         .where(
-            ActivityLog.user_id == user.id,
+            ActivityLog.user_id == user_id,
             ActivityLog.start_time >= start_time,
             ActivityLog.end_time <= end_time
         )
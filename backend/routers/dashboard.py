@@ -0,0 +1,76 @@
+# backend/routers/dashboard.py
+
+import asyncio
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+import pytz
+
+from database import async_session
+from routers.activity import activity_logs
+from routers.google_health import today_health_data, weekly_sleep
+from routers.personalized_ai import anomaly_report, personal_model_status, _model_stamp
+from services.etags import etag_validator
+from services.user_cache import CachedUser, get_user_by_user_email
+
+router = APIRouter()
+
+
+async def _widget(name: str, read):
+    """
+    Run one widget's read on its own session (an AsyncSession can't run
+    queries concurrently). A failing widget reports its error instead of
+    failing the whole dashboard.
+    """
+    try:
+        async with async_session() as db:
+            return await read(db)
+    except HTTPException as e:
+        return {"error": e.detail, "status_code": e.status_code}
+    except Exception as e:
+        print(f" Dashboard widget {name} failed: {e}")
+        return {"error": "Failed to load", "status_code": 500}
+
+
+def _dashboard_stamp(user: CachedUser) -> tuple:
+    # The payload also carries the profile, which changes without a sync
+    return _model_stamp(user), tuple(user.profile().values())
+
+
+@router.get("/dashboard", dependencies=[Depends(etag_validator(get_user_by_user_email, extra=_dashboard_stamp, rolling=True))])
+async def get_dashboard(
+    user: CachedUser = Depends(get_user_by_user_email),
+    activity_days: int = Query(7, ge=1, le=90),
+    anomaly_date: str = Query(default=None, description="YYYY-MM-DD (IST), defaults to the latest day with resting data"),
+):
+    """
+    Everything the dashboard's first paint needs in one response: today's
+    readings, the week's sleep, recent activities, model status and the
+    personalized anomaly report. The user is resolved once and every read
+    uses the same clock, so widgets agree on what "today" is.
+    """
+    if anomaly_date:
+        try:
+            datetime.strptime(anomaly_date, "%Y-%m-%d")
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
+
+    now = datetime.utcnow()
+    today_ist = pytz.UTC.localize(now).astimezone(pytz.timezone("Asia/Kolkata")).date()
+
+    health_data, sleep_week, activities, anomaly = await asyncio.gather(
+        _widget("health_data", lambda db: today_health_data(db, user.id, today_ist)),
+        _widget("sleep_week", lambda db: weekly_sleep(db, user.id, now)),
+        _widget("activity_logs", lambda db: activity_logs(db, user.id, activity_days, now)),
+        _widget("anomaly", lambda db: anomaly_report(db, user.id, anomaly_date)),
+    )
+
+    return {
+        "as_of": now.isoformat() + "Z",
+        "user": user.profile(),
+        "health_data": health_data,
+        "sleep_week": sleep_week,
+        "activity_logs": activities,
+        "model_status": await personal_model_status(user=user),
+        "anomaly": anomaly,
+    }
@@ -0,0 +1,160 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.future import select
+from datetime import datetime, timedelta
+import csv
+import io
+import os
+
+import orjson
+import pytz
+
+from database import async_session
+from models import HealthData, SleepSession, ActivityLog
+from services.user_cache import CachedUser, get_user_by_user_email
+
+router = APIRouter()
+
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "2000"))
+
+EXPORT_COLUMNS = [
+    "record_type",
+    "timestamp",
+    "end_time",
+    "metric_type",
+    "value",
+    "systolic",
+    "diastolic",
+    "activity_type",
+    "duration_hours",
+]
+
+EXPORT_TABLES = ["healthdata", "sleep", "activity"]
+
+
+def _export_queries(user_id: int, start_utc: datetime, end_utc: datetime, tables: list):
+    """
+    (record_type, column names, select) per table. Only plain columns are
+    selected, ordered to match an existing (user_id, ...) index so the
+    database can stream rows without sorting the user's whole history.
+    """
+    queries = []
+
+    if "healthdata" in tables:
+        filters = [HealthData.user_id == user_id]
+        if start_utc:
+            filters.append(HealthData.timestamp >= start_utc)
+        if end_utc:
+            filters.append(HealthData.timestamp < end_utc)
+        queries.append((
+            "healthdata",
+            ["timestamp", "metric_type", "value", "systolic", "diastolic", "activity_type"],
+            select(
+                HealthData.timestamp,
+                HealthData.metric_type,
+                HealthData.value,
+                HealthData.systolic,
+                HealthData.diastolic,
+                HealthData.activity_type,
+            )
+            .where(*filters)
+            .order_by(HealthData.metric_type, HealthData.timestamp),
+        ))
+
+    if "sleep" in tables:
+        filters = [SleepSession.user_id == user_id]
+        if start_utc:
+            filters.append(SleepSession.start_time >= start_utc)
+        if end_utc:
+            filters.append(SleepSession.start_time < end_utc)
+        queries.append((
+            "sleep",
+            ["timestamp", "end_time", "duration_hours"],
+            select(SleepSession.start_time, SleepSession.end_time, SleepSession.duration_hours)
+            .where(*filters)
+            .order_by(SleepSession.start_time),
+        ))
+
+    if "activity" in tables:
+        filters = [ActivityLog.user_id == user_id]
+        if start_utc:
+            filters.append(ActivityLog.start_time >= start_utc)
+        if end_utc:
+            filters.append(ActivityLog.start_time < end_utc)
+        queries.append((
+            "activity",
+            ["timestamp", "end_time", "activity_type"],
+            select(ActivityLog.start_time, ActivityLog.end_time, ActivityLog.activity_type)
+            .where(*filters)
+            .order_by(ActivityLog.start_time),
+        ))
+
+    return queries
+
+
+async def _stream_export(user_id: int, start_utc: datetime, end_utc: datetime, tables: list, fmt: str):
+    # The request's session is closed once the endpoint returns, so the
+    # generator opens its own and keeps one server-side cursor per table.
+    async with async_session() as db:
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_COLUMNS)
+            yield buffer.getvalue()
+
+        for record_type, names, query in _export_queries(user_id, start_utc, end_utc, tables):
+            result = await db.stream(query.execution_options(yield_per=EXPORT_CHUNK_ROWS))
+
+            async for rows in result.partitions():
+                if fmt == "csv":
+                    buffer.seek(0)
+                    buffer.truncate()
+                    for row in rows:
+                        record = dict(zip(names, row))
+                        record["record_type"] = record_type
+                        writer.writerow([
+                            value.isoformat() if isinstance(value, datetime) else value
+                            for value in (record.get(c) for c in EXPORT_COLUMNS)
+                        ])
+                    yield buffer.getvalue()
+                else:
+                    yield b"".join(
+                        orjson.dumps({"record_type": record_type, **dict(zip(names, row))}) + b"\n"
+                        for row in rows
+                    )
+
+
+@router.get("/export/health-history")
+async def export_health_history(
+    user: CachedUser = Depends(get_user_by_user_email),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    start_date: str = Query(default=None, description="YYYY-MM-DD (IST), defaults to the beginning of history"),
+    end_date: str = Query(default=None, description="YYYY-MM-DD (IST), inclusive, defaults to now"),
+    include: str = Query("healthdata,sleep,activity", description="Comma-separated: healthdata, sleep, activity"),
+):
+    tables = [t.strip() for t in include.split(",") if t.strip()]
+    unknown = [t for t in tables if t not in EXPORT_TABLES]
+    if unknown or not tables:
+        raise HTTPException(status_code=400, detail=f"include must be a subset of {', '.join(EXPORT_TABLES)}")
+
+    india_tz = pytz.timezone("Asia/Kolkata")
+    try:
+        start_utc = (
+            india_tz.localize(datetime.strptime(start_date, "%Y-%m-%d")).astimezone(pytz.UTC).replace(tzinfo=None)
+            if start_date else None
+        )
+        end_utc = (
+            india_tz.localize(datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)).astimezone(pytz.UTC).replace(tzinfo=None)
+            if end_date else None
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"health_export_{user.id}.{format}"
+
+    return StreamingResponse(
+        _stream_export(user.id, start_utc, end_utc, tables, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -9,6 +9,8 @@ import httpx
 import os
 from database import get_db
 from models import User
+from services.http_client import get_http_client
+from services.user_cache import user_cache
 
 from urllib.parse import urlencode
 
@@ -48,14 +50,14 @@ SCOPES = [
     "profile"
 ]
 
-async def refresh_access_token(refresh_token: str):
-    async with httpx.AsyncClient() as client:
-        response = await client.post(GOOGLE_TOKEN_URL, data={
-            "client_id": os.getenv("GOOGLE_CLIENT_ID"),
-            "client_secret": os.getenv("GOOGLE_CLIENT_SECRET"),
-            "refresh_token": refresh_token,
-            "grant_type": "refresh_token",
-        })
+async def refresh_access_token(refresh_token: str, client: httpx.AsyncClient = None):
+    client = client or get_http_client()
+    response = await client.post(GOOGLE_TOKEN_URL, data={
+        "client_id": os.getenv("GOOGLE_CLIENT_ID"),
+        "client_secret": os.getenv("GOOGLE_CLIENT_SECRET"),
+        "refresh_token": refresh_token,
+        "grant_type": "refresh_token",
+    })
 
     if response.status_code != 200:
         raise HTTPException(status_code=401, detail="Unable to refresh token")
@@ -80,8 +82,19 @@ async def login():
 
 
 
+def expires_at_from(token_json: dict):
+    expires_in = token_json.get("expires_in")
+    if not expires_in:
+        return None
+    return datetime.utcnow().replace(microsecond=0) + timedelta(seconds=int(expires_in))
+
+
 @router.get("/auth/google/callback")
-async def google_callback(request: Request, db: AsyncSession = Depends(get_db)):
+async def google_callback(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    client: httpx.AsyncClient = Depends(get_http_client),
+):
     code = request.query_params.get("code")
 
     if not code:
@@ -98,9 +111,8 @@ async def google_callback(request: Request, db: AsyncSession = Depends(get_db)):
     print("REDIRECT_URI =", os.getenv("REDIRECT_URI"))
     print("FRONTEND_URL =", os.getenv("FRONTEND_URL"))
 
-    async with httpx.AsyncClient() as client:
-        token_response = await client.post(GOOGLE_TOKEN_URL, data=token_data)
-        token_json = token_response.json()
+    token_response = await client.post(GOOGLE_TOKEN_URL, data=token_data)
+    token_json = token_response.json()
 
     if "access_token" not in token_json:
         print("Token exchange failed:", token_json)
@@ -108,15 +120,15 @@ async def google_callback(request: Request, db: AsyncSession = Depends(get_db)):
 
     access_token = token_json["access_token"]
     refresh_token = token_json.get("refresh_token")  # Can be None on repeated login
+    token_expires_at = expires_at_from(token_json)
 
     # Step 2: Fetch user info using the access token
     user_info_url = "https://www.googleapis.com/oauth2/v2/userinfo"
     headers = {"Authorization": f"Bearer {access_token}"}
 
 
-    async with httpx.AsyncClient() as client:
-        user_info_response = await client.get(user_info_url, headers=headers)
-        user_info = user_info_response.json()
+    user_info_response = await client.get(user_info_url, headers=headers)
+    user_info = user_info_response.json()
 
     if "email" not in user_info:
         print("User info fetch failed:", user_info)
@@ -139,24 +151,35 @@ async def google_callback(request: Request, db: AsyncSession = Depends(get_db)):
             email=email,
             profile_pic=picture,
             access_token=access_token,
-            refresh_token=refresh_token
+            refresh_token=refresh_token,
+            token_expires_at=token_expires_at,
         )
         db.add(user)
     
     else:
         user.access_token = access_token
         user.refresh_token = refresh_token or user.refresh_token
+        user.token_expires_at = token_expires_at
 
     await db.commit()
     await db.refresh(user)
 
+    # Imported here: services.token_manager imports this module
+    from services.token_manager import token_manager
+    token_manager.store(user)
+    user_cache.invalidate(email=user.email)
+
     frontend_url = f"{FRONTEND_URL}/oauth-success?email={email}"
     return RedirectResponse(frontend_url)
 
 
 
 @router.get("/auth/fitness/heart-rate")
-async def get_heart_rate_data(db:AsyncSession = Depends(get_db), email: str = "testuser@example.com"):
+async def get_heart_rate_data(
+    db: AsyncSession = Depends(get_db),
+    email: str = "testuser@example.com",
+    client: httpx.AsyncClient = Depends(get_http_client),
+):
 
     result = await db.execute(select(User).where(User.email == email))
     user = result.scalars().first()
@@ -181,8 +204,7 @@ async def get_heart_rate_data(db:AsyncSession = Depends(get_db), email: str = "t
         "endTimeMillis": int(datetime.utcnow().timestamp() * 1000)
     }
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(url, headers=headers, json=body)
+    response = await client.post(url, headers=headers, json=body)
 
     if response.status_code != 200:
         raise HTTPException(status_code=response.status_code, detail="Failed to fetch heart rate data")
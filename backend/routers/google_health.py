@@ -5,9 +5,22 @@ from models import User, HealthData, SleepSession
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from database import get_db
-from typing import List
+from typing import List, Optional
 from schemas import UserUpdate
 from services.google_sync import sync_google_fit_data
+from services.http_client import get_http_client
+from services.user_cache import CachedUser, get_user_by_user_email, user_cache
+from services.etags import etag_validator
+from services.response_cache import response_cache, RESPONSE_CACHE_ROLLING_TTL_SECONDS
+from services.health_aggregates import (
+    resolve_bucket_seconds,
+    downsampled_history,
+    metric_summary,
+    raw_series_columns,
+    SERIES_METRICS,
+)
+from utils.columnar import points_to_columns
+from fastapi.responses import ORJSONResponse
 
 from pydantic import BaseModel
 
@@ -22,7 +35,11 @@ class SyncRequest(BaseModel):
     days_back: int = 7  # default to 7 days
 
 @router.post("/google/sync")
-async def sync_now(payload: SyncRequest, db: AsyncSession = Depends(get_db)):
+async def sync_now(
+    payload: SyncRequest,
+    db: AsyncSession = Depends(get_db),
+    client: httpx.AsyncClient = Depends(get_http_client),
+):
     user_email = payload.user_email
     days_back = payload.days_back
 
@@ -32,39 +49,52 @@ async def sync_now(payload: SyncRequest, db: AsyncSession = Depends(get_db)):
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    await sync_google_fit_data(user, db, days_back=days_back)
+    result = await sync_google_fit_data(user, db, days_back=days_back, client=client)
+    if result["failed_metrics"]:
+        return {
+            "detail": "Synced partially; failed metrics will be retried on the next sync",
+            "failed_metrics": result["failed_metrics"],
+        }
     return {"detail": f"Synced successfully for last {days_back} days"}
 
-@router.get("/google/health-data")
+@router.get("/google/health-data", dependencies=[Depends(etag_validator(get_user_by_user_email, rolling=True))])
 async def get_today_health_data(
-    user_email: str,
+    user: CachedUser = Depends(get_user_by_user_email),
+    summary_only: bool = Query(False, description="Return only averageMetrics, computed in SQL"),
+    format: str = Query("rows", pattern="^(rows|columnar)$", description="rows = list of points, columnar = parallel arrays with delta-encoded timestamps"),
     db: AsyncSession = Depends(get_db)
 ):
-
-    result = await db.execute(select(User).where(User.email == user_email))
-    user = result.scalars().first()
-
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    today_ist = datetime.now(pytz.timezone("Asia/Kolkata")).date()
+    return await today_health_data(db, user.id, today_ist, summary_only=summary_only, format=format)
 
 
+async def today_health_data(db: AsyncSession, user_id: int, today_ist, summary_only: bool = False, format: str = "rows"):
+    """One IST day of readings, as served by /google/health-data."""
     india_tz = pytz.timezone("Asia/Kolkata")
-    today_ist = datetime.now(india_tz).date()
-
 
-    
     # IST midnight → UTC range
     ist_start = india_tz.localize(datetime.combine(today_ist, datetime.min.time()))
     ist_end = india_tz.localize(datetime.combine(today_ist, datetime.max.time()))
     start_utc = ist_start.astimezone(timezone.utc)
     end_utc = ist_end.astimezone(timezone.utc)
+
+    if summary_only:
+        start_naive = start_utc.replace(tzinfo=None)
+        return {
+            "averageMetrics": await metric_summary(db, user_id, start_naive, start_naive + timedelta(days=1))
+        }
+
+    if format == "columnar":
+        start_naive = start_utc.replace(tzinfo=None)
+        series = await raw_series_columns(db, user_id, start_naive, start_naive + timedelta(days=1))
+        return ORJSONResponse({**series, "format": "columnar"})
  
     
 
     # Fetch today's data from DB
     result = await db.execute(
         select(HealthData).where(
-            HealthData.user_id == user.id,
+            HealthData.user_id == user_id,
             HealthData.timestamp >= start_utc,
             HealthData.timestamp <= end_utc
         )
@@ -128,19 +158,26 @@ async def get_today_health_data(
 
 
 
-@router.get("/sleep/week")
-async def get_weekly_sleep(user_email: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(User).where(User.email == user_email))
-    user = result.scalars().first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
+@router.get("/sleep/week", dependencies=[Depends(etag_validator(get_user_by_user_email, rolling=True))])
+async def get_weekly_sleep(user: CachedUser = Depends(get_user_by_user_email), db: AsyncSession = Depends(get_db)):
     now = datetime.utcnow()
+    # The window moves with now, so the entry also expires on its own
+    return await response_cache.get_or_compute(
+        user.id,
+        ("sleep/week",),
+        None,
+        lambda: weekly_sleep(db, user.id, now),
+        ttl=RESPONSE_CACHE_ROLLING_TTL_SECONDS,
+    )
+
+
+async def weekly_sleep(db: AsyncSession, user_id: int, now: datetime):
+    """Sleep sessions started in the 7 days before now (UTC naive)."""
     one_week_ago = now - timedelta(days=7)
 
     result = await db.execute(
         select(SleepSession).where(
-            SleepSession.user_id == user.id,
+            SleepSession.user_id == user_id,
             SleepSession.start_time >= one_week_ago,
             SleepSession.start_time <= now
         ).order_by(SleepSession.start_time)
@@ -161,14 +198,8 @@ async def get_weekly_sleep(user_email: str, db: AsyncSession = Depends(get_db)):
     return {"sleep_sessions": sleep_summary}
 
 
-@router.get("/sleep-sessions")
-async def get_sleep_sessions(user_email: str, days: int = 7, db: AsyncSession = Depends(get_db)):
-    user = await db.execute(select(User).where(User.email == user_email))
-    user = user.scalars().first()
-
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found.")
-
+@router.get("/sleep-sessions", dependencies=[Depends(etag_validator(get_user_by_user_email, rolling=True))])
+async def get_sleep_sessions(user: CachedUser = Depends(get_user_by_user_email), days: int = 7, db: AsyncSession = Depends(get_db)):
     end_dt = datetime.utcnow()
     start_dt = end_dt - timedelta(days=days)
 
@@ -193,11 +224,15 @@ async def get_sleep_sessions(user_email: str, days: int = 7, db: AsyncSession =
         ]
     }
 
-@router.get("/healthdata/history")
+@router.get("/healthdata/history", dependencies=[Depends(etag_validator(get_user_by_user_email))])
 async def get_health_data_history(
-    user_email: str,
+    user: CachedUser = Depends(get_user_by_user_email),
     start_date: str = Query(..., description="YYYY-MM-DD"),
     end_date: str = Query(..., description="YYYY-MM-DD"),
+    resolution: Optional[str] = Query(None, description="raw | 1min | 5min | 15min | hour | day"),
+    max_points: Optional[int] = Query(None, ge=1, description="Max points per metric; server downsamples to fit"),
+    summary_only: bool = Query(False, description="Return only averageMetrics, computed in SQL"),
+    format: str = Query("rows", pattern="^(rows|columnar)$", description="rows = list of points, columnar = parallel arrays with delta-encoded timestamps"),
     db: AsyncSession = Depends(get_db),
 ):
     try:
@@ -217,10 +252,64 @@ async def get_health_data_history(
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
 
-    result = await db.execute(select(User).where(User.email == user_email))
-    user = result.scalars().first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found.")
+    try:
+        bucket_seconds = resolve_bucket_seconds(resolution, max_points, start_dt, end_dt)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Ranges in the past are computed once; a sync only stales ranges
+    # reaching into the days it wrote.
+    return await response_cache.get_or_compute(
+        user.id,
+        ("healthdata/history", start_date, end_date, bucket_seconds, summary_only, format),
+        end_dt.replace(tzinfo=None),
+        lambda: health_data_history(db, user.id, start_dt, end_dt, bucket_seconds, summary_only, format, start_date),
+    )
+
+
+async def health_data_history(
+    db: AsyncSession,
+    user_id: int,
+    start_dt: datetime,
+    end_dt: datetime,
+    bucket_seconds: Optional[int],
+    summary_only: bool,
+    format: str,
+    start_date: str,
+):
+    """The /healthdata/history payload for a validated UTC range."""
+    if summary_only:
+        return {
+            "averageMetrics": await metric_summary(
+                db, user_id, start_dt.replace(tzinfo=None), end_dt.replace(tzinfo=None)
+            )
+        }
+
+    # Downsampled: min/avg/max per time bucket computed in SQL
+    if bucket_seconds:
+        history = await downsampled_history(
+            db,
+            user_id,
+            start_dt.replace(tzinfo=None),
+            end_dt.replace(tzinfo=None),
+            bucket_seconds,
+        )
+        if format == "columnar":
+            for metric in SERIES_METRICS:
+                fields = ("systolic", "diastolic") if metric == "blood_pressure" else ("value", "min", "max", "count")
+                history[metric] = points_to_columns(history[metric], fields)
+            return ORJSONResponse({**history, "format": "columnar"})
+        return history
+
+    # Columnar raw series: parallel arrays straight from row tuples
+    if format == "columnar":
+        start_naive, end_naive = start_dt.replace(tzinfo=None), end_dt.replace(tzinfo=None)
+        series = await raw_series_columns(db, user_id, start_naive, end_naive)
+        return ORJSONResponse({
+            **series,
+            "averageMetrics": await metric_summary(db, user_id, start_naive, end_naive),
+            "format": "columnar",
+        })
 
     # Time-series data containers
     heart_rate = []
@@ -235,7 +324,7 @@ async def get_health_data_history(
     # Fetch all health records for date range
     result = await db.execute(
         select(HealthData).where(
-            HealthData.user_id == user.id,
+            HealthData.user_id == user_id,
             HealthData.timestamp >= start_dt, 
             HealthData.timestamp < end_dt, 
         )
@@ -337,6 +426,7 @@ async def update_user_profile(update_data: UserUpdate, db: AsyncSession = Depend
 
         await db.commit()
         await db.refresh(user)
+        user_cache.invalidate(email=user.email)
 
         return {"message": "User profile updated successfully"}
 
@@ -345,7 +435,11 @@ async def update_user_profile(update_data: UserUpdate, db: AsyncSession = Depend
 
 
 @router.get("/google/devices")
-async def get_google_devices(user_email: str, db: AsyncSession = Depends(get_db)):
+async def get_google_devices(
+    user_email: str,
+    db: AsyncSession = Depends(get_db),
+    client: httpx.AsyncClient = Depends(get_http_client),
+):
     result = await db.execute(select(User).where(User.email == user_email))
     user = result.scalars().first()
     if not user or not user.access_token:
@@ -354,29 +448,28 @@ async def get_google_devices(user_email: str, db: AsyncSession = Depends(get_db)
     url = "https://www.googleapis.com/fitness/v1/users/me/dataSources"
     headers = {"Authorization": f"Bearer {user.access_token}"}
 
-    async with httpx.AsyncClient() as client:
-        res = await client.get(url, headers=headers)
-        if res.status_code != 200:
-            raise HTTPException(status_code=res.status_code, detail="Failed to fetch data sources")
+    res = await client.get(url, headers=headers)
+    if res.status_code != 200:
+        raise HTTPException(status_code=res.status_code, detail="Failed to fetch data sources")
 
-        data_sources = res.json().get("dataSource", [])
+    data_sources = res.json().get("dataSource", [])
 
-        
-        seen = set()
-        devices = []
-
-        for source in data_sources:
-            device = source.get("device")
-            if device:
-                key = (device.get("manufacturer"), device.get("model"), device.get("uid"))
-                if key not in seen:
-                    seen.add(key)
-                    devices.append({
-                        "type": device.get("type"),
-                        "manufacturer": device.get("manufacturer"),
-                        "model": device.get("model"),
-                        "version": device.get("version"),
-                        "uid": device.get("uid")
-                    })
-
-        return {"devices": devices}
+    
+    seen = set()
+    devices = []
+
+    for source in data_sources:
+        device = source.get("device")
+        if device:
+            key = (device.get("manufacturer"), device.get("model"), device.get("uid"))
+            if key not in seen:
+                seen.add(key)
+                devices.append({
+                    "type": device.get("type"),
+                    "manufacturer": device.get("manufacturer"),
+                    "model": device.get("model"),
+                    "version": device.get("version"),
+                    "uid": device.get("uid")
+                })
+
+    return {"devices": devices}
@@ -7,14 +7,24 @@ from sqlalchemy import func
 from datetime import datetime, timedelta
 import pytz
 import os
-import joblib
 import numpy as np
 
-from models import User, HealthData
+from models import User, HealthData, RestingWindow
+from schema_models.ai import BatchAnomalyRequest
 from database import get_db
 import pandas as pd
 
-from services.train_user_model import train_user_model
+from services.train_user_model import get_retrain_eligibility, _load_metadata
+from services.training_executor import training_executor
+from services.model_registry import ModelUpdatingError, model_registry
+from services.user_cache import CachedUser, get_user_by_email
+from services.etags import etag_validator
+from services.response_cache import response_cache
+from services.feature_store import (
+    load_resting_windows,
+    resting_days_with_data,
+    FEATURE_COLUMNS,
+)
 
 router = APIRouter()
 
@@ -29,18 +39,35 @@ RESTING_METRICS = ["heart_rate", "spo2", "blood_pressure"]
 # Utility: Load trained user model 
 # ---------------------------------------------------
 async def get_user_model(user_id: int):
-    user_folder = os.path.join(BASE_PATH, f"user_{user_id}")
-    model_path = os.path.join(user_folder, "unsupervised_model.pkl")
-    scaler_path = os.path.join(user_folder, "scaler.pkl")
-
-    if not os.path.exists(model_path) or not os.path.exists(scaler_path):
+    try:
+        loaded = await model_registry.get(user_id)
+    except ModelUpdatingError:
+        # Trained, but mid-rewrite: not the same as "not trained yet"
+        raise HTTPException(
+            status_code=503,
+            detail="Personalized model is being updated, retry shortly",
+            headers={"Retry-After": "1"},
+        )
+    if loaded is None:
         raise HTTPException(status_code=202, detail="Personalized model not trained yet")
 
-    model = joblib.load(model_path)
-    scaler = joblib.load(scaler_path)
+    model, scaler = loaded
     return model, scaler
 
 
+def _ist_offset_seconds() -> int:
+    # Asia/Kolkata has had a fixed +05:30 offset since 1945
+    return int(datetime.now(TZ).utcoffset().total_seconds())
+
+
+def _ist_isoformat(index) -> np.ndarray:
+    """UTC-naive window starts -> IST isoformat strings, e.g. 2025-06-01T05:30:00+05:30."""
+    local = pd.DatetimeIndex(index).tz_localize("UTC").tz_convert(TZ).tz_localize(None)
+    offset = _ist_offset_seconds() // 60
+    suffix = f"+{offset // 60:02d}:{offset % 60:02d}"
+    return np.char.add(np.datetime_as_string(local.values, unit="s"), suffix)
+
+
 def _ist_day_bounds_to_utc_naive(day_start_ist: datetime):
     
     start_ist = day_start_ist
@@ -73,30 +100,30 @@ async def _pick_latest_ist_day_with_data(db: AsyncSession, user_id: int, min_win
 
     min_rows_hint = max(10, min_windows * 3)
 
+    # One grouped query for the 8-day lookback instead of a COUNT per day
+    latest_day_ist = latest_ist.replace(hour=0, minute=0, second=0, microsecond=0)
+    lookback_start_ist = TZ.localize(datetime.combine(latest_day_ist.date() - timedelta(days=7), datetime.min.time()))
+    start_utc_naive, _, _ = _ist_day_bounds_to_utc_naive(lookback_start_ist)
+    _, end_utc_naive, _ = _ist_day_bounds_to_utc_naive(latest_day_ist)
+
+    counts = await resting_days_with_data(db, user_id, start_utc_naive, end_utc_naive, _ist_offset_seconds())
+
     for back in range(0, 8):
-        candidate = latest_ist - timedelta(days=back)
-        day_start_ist = candidate.replace(hour=0, minute=0, second=0, microsecond=0)
-
-        start_utc_naive, end_utc_naive, _ = _ist_day_bounds_to_utc_naive(day_start_ist)
-
-        row_count = (
-            await db.execute(
-                select(func.count())
-                .select_from(HealthData)
-                .where(
-                    HealthData.user_id == user_id,
-                    HealthData.activity_type == "resting",
-                    HealthData.metric_type.in_(RESTING_METRICS),
-                    HealthData.timestamp >= start_utc_naive,
-                    HealthData.timestamp < end_utc_naive,
-                )
-            )
-        ).scalar_one()
+        candidate = latest_day_ist.date() - timedelta(days=back)
+        if counts.get(candidate, 0) >= min_rows_hint:
+            return TZ.localize(datetime.combine(candidate, datetime.min.time()))
+
+    return latest_day_ist
 
-        if row_count >= min_rows_hint:
-            return day_start_ist
 
-    return latest_ist.replace(hour=0, minute=0, second=0, microsecond=0)
+def _model_stamp(user: CachedUser) -> tuple:
+    # Model-backed responses change with training as well as with syncs
+    user_folder = os.path.join(BASE_PATH, f"user_{user.id}")
+    return (
+        _load_metadata(user.id).get("last_trained"),
+        os.path.exists(user_folder),
+        os.path.exists(os.path.join(user_folder, "unsupervised_model.pkl")),
+    )
 
 
 def _confidence_label(total_windows: int) -> str:
@@ -121,81 +148,58 @@ def _human_metric_name(key: str) -> str:
 # ---------------------------------------------------
 # Personalized anomaly detection endpoint
 # ---------------------------------------------------
-@router.get("/personal_anomaly")
+@router.get("/personal_anomaly", dependencies=[Depends(etag_validator(get_user_by_email, extra=_model_stamp))])
 async def personal_anomaly(
-    email: str,
+    user: CachedUser = Depends(get_user_by_email),
     date: str = Query(default=None, description="YYYY-MM-DD"),
+    format: str = Query("rows", pattern="^(rows|columnar)$", description="rows = list of points, columnar = parallel arrays"),
     db: AsyncSession = Depends(get_db),
 ):
-    # 1️ Get user
-    result = await db.execute(select(User).where(User.email == email))
-    user = result.scalar_one_or_none()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    # Past days are final once synced: score them once per model version
+    if date:
+        try:
+            day = datetime.strptime(date, "%Y-%m-%d").date()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
+        if day < datetime.now(TZ).date():
+            _, end_utc_naive, _ = _ist_day_bounds_to_utc_naive(TZ.localize(datetime.combine(day, datetime.min.time())))
+            return await response_cache.get_or_compute(
+                user.id,
+                ("personal_anomaly", date, format, _model_stamp(user)),
+                end_utc_naive,
+                lambda: anomaly_report(db, user.id, date, format),
+            )
 
-    # 2️ Determine IST day start
+    return await anomaly_report(db, user.id, date, format)
+
+
+async def anomaly_report(db: AsyncSession, user_id: int, date: str = None, format: str = "rows"):
+    """The /personal_anomaly payload for an IST day (default: latest with data)."""
+    # 1️ Determine IST day start
     if date:
         naive_local = datetime.strptime(date, "%Y-%m-%d")
         selected = TZ.localize(naive_local)
         start_ist = selected.replace(hour=0, minute=0, second=0, microsecond=0)
     else:
-        start_ist = await _pick_latest_ist_day_with_data(db, user.id, min_windows=3)
+        start_ist = await _pick_latest_ist_day_with_data(db, user_id, min_windows=3)
         if not start_ist:
             return {"status": "no_data", "message": "No resting health data available"}
 
     start_utc_naive, end_utc_naive, _ = _ist_day_bounds_to_utc_naive(start_ist)
 
-    # 3️ Fetch resting health metrics within UTC-naive bounds
-    result = await db.execute(
-        select(HealthData).where(
-            HealthData.user_id == user.id,
-            HealthData.metric_type.in_(RESTING_METRICS),
-            HealthData.activity_type == "resting",
-            HealthData.timestamp >= start_utc_naive,
-            HealthData.timestamp < end_utc_naive,
-        )
-    )
-    records = result.scalars().all()
+    # 2️ Load this day's 5-minute resting windows from the feature store
+    windowed = await load_resting_windows(db, user_id, start_utc_naive, end_utc_naive)
 
-    if not records:
+    if windowed.empty:
         return {"status": "no_data", "message": "No resting health data for this day"}
 
-    # 4️ Convert records to DataFrame
-    rows = []
-    for r in records:
-        rows.append(
-            {
-                "timestamp": r.timestamp,  # UTC-naive in DB
-                "heart_rate": r.value if r.metric_type == "heart_rate" else None,
-                "spo2": r.value if r.metric_type == "spo2" else None,
-                "systolic_bp": r.systolic if r.metric_type == "blood_pressure" else None,
-                "diastolic_bp": r.diastolic if r.metric_type == "blood_pressure" else None,
-            }
-        )
-
-    df = pd.DataFrame(rows)
-    df["timestamp"] = pd.to_datetime(df["timestamp"])
-    df.set_index("timestamp", inplace=True)
-
-    # 5-minute window aggregation
-    windowed = df.resample("5min").agg(
-        {
-            "heart_rate": "mean",
-            "spo2": "min",
-            "systolic_bp": "max",
-            "diastolic_bp": "max",
-        }
-    )
-
-    windowed.dropna(inplace=True)
-
     if len(windowed) < 3:
         return {"status": "insufficient", "message": "Not enough aggregated data windows"}
 
     X = windowed.values
 
-    # 5️ Load model & predict
-    model, scaler = await get_user_model(user.id)
+    # 3️ Load model & predict
+    model, scaler = await get_user_model(user_id)
     X_scaled = scaler.transform(X)
     predictions = model.predict(X_scaled)
 
@@ -206,38 +210,40 @@ async def personal_anomaly(
     # ---------------------------------------------------
     # NEW: Build UI-friendly series + anomaly timestamps
     # ---------------------------------------------------
-    series = []
-    anomaly_timestamps = []
-
-
-    for ts_utc_naive, row, pred in zip(windowed.index, windowed.values, predictions):
-        ts_utc = pytz.UTC.localize(pd.to_datetime(ts_utc_naive).to_pydatetime())
-        ts_ist = ts_utc.astimezone(TZ)
-
-        point = {
-            "timestamp": ts_ist.isoformat(), 
-            "heart_rate": float(row[0]),
-            "spo2": float(row[1]),
-            "systolic_bp": float(row[2]),
-            "diastolic_bp": float(row[3]),
-            "is_anomaly": int(pred == -1),
-        }
-        series.append(point)
-        if pred == -1:
-            anomaly_timestamps.append(point["timestamp"])
+    timestamps = _ist_isoformat(windowed.index)
+    is_anomaly = (predictions == -1).astype(int)
+    anomaly_timestamps = timestamps[is_anomaly == 1].tolist()
 
-    
-    cols = ["heart_rate", "spo2", "systolic_bp", "diastolic_bp"]
-    contrib_scores = {}
+    values = windowed[FEATURE_COLUMNS].to_numpy(dtype=float)
+    columns = {c: values[:, k].tolist() for k, c in enumerate(FEATURE_COLUMNS)}
 
-    for c in cols:
-        vals = windowed[c].values.astype(float)
-        mu = float(np.mean(vals))
-        sd = float(np.std(vals)) or 1.0
-        contrib_scores[c] = float(np.mean(np.abs((vals - mu) / sd)))
+    if format == "columnar":
+        series = {"timestamp": timestamps.tolist(), **columns, "is_anomaly": is_anomaly.tolist()}
+    else:
+        series = [
+            {
+                "timestamp": ts,
+                "heart_rate": hr,
+                "spo2": o2,
+                "systolic_bp": sbp,
+                "diastolic_bp": dbp,
+                "is_anomaly": flag,
+            }
+            for ts, hr, o2, sbp, dbp, flag in zip(
+                timestamps.tolist(),
+                columns["heart_rate"],
+                columns["spo2"],
+                columns["systolic_bp"],
+                columns["diastolic_bp"],
+                is_anomaly.tolist(),
+            )
+        ]
 
-    contributors_sorted = sorted(contrib_scores.items(), key=lambda x: x[1], reverse=True)
-    top_contributors = [_human_metric_name(k) for k, _ in contributors_sorted[:2]]
+    # Mean absolute z-score per feature, all columns at once
+    sd = values.std(axis=0)
+    sd[sd == 0] = 1.0
+    contrib = np.abs((values - values.mean(axis=0)) / sd).mean(axis=0)
+    top_contributors = [_human_metric_name(FEATURE_COLUMNS[k]) for k in np.argsort(-contrib, kind="stable")[:2]]
 
     return {
         
@@ -257,15 +263,148 @@ async def personal_anomaly(
 
 
 # ---------------------------------------------------
-# Model readiness status endpoint
+# Calendar: IST days with resting data
 # ---------------------------------------------------
-@router.get("/personal_model_status")
-async def personal_model_status(email: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(User).where(User.email == email))
-    user = result.scalar_one_or_none()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+@router.get("/personal_anomaly/days", dependencies=[Depends(etag_validator(get_user_by_email, rolling=True))])
+async def personal_anomaly_days(
+    user: CachedUser = Depends(get_user_by_email),
+    start_date: str = Query(default=None, description="YYYY-MM-DD (defaults to 30 days before end_date)"),
+    end_date: str = Query(default=None, description="YYYY-MM-DD (defaults to today)"),
+    db: AsyncSession = Depends(get_db),
+):
+    try:
+        last_day = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else datetime.now(TZ).date()
+        first_day = datetime.strptime(start_date, "%Y-%m-%d").date() if start_date else last_day - timedelta(days=30)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
+    if first_day > last_day:
+        raise HTTPException(status_code=400, detail="start_date must be before end_date.")
+
+    start_utc_naive, _, _ = _ist_day_bounds_to_utc_naive(TZ.localize(datetime.combine(first_day, datetime.min.time())))
+    _, end_utc_naive, _ = _ist_day_bounds_to_utc_naive(TZ.localize(datetime.combine(last_day, datetime.min.time())))
+
+    counts = await resting_days_with_data(db, user.id, start_utc_naive, end_utc_naive, _ist_offset_seconds())
+
+    return {
+        "start_date": first_day.isoformat(),
+        "end_date": last_day.isoformat(),
+        "days": [{"date": d.isoformat(), "resting_rows": n} for d, n in counts.items()],
+    }
 
+
+# ---------------------------------------------------
+# Batch anomaly scoring (clinician panel view)
+# ---------------------------------------------------
+BATCH_MAX_USERS = 200
+BATCH_MAX_DAYS = 31
+
+
+@router.post("/personal_anomaly/batch")
+async def personal_anomaly_batch(payload: BatchAnomalyRequest, db: AsyncSession = Depends(get_db)):
+    try:
+        first_day = TZ.localize(datetime.strptime(payload.start_date, "%Y-%m-%d"))
+        last_day = TZ.localize(datetime.strptime(payload.end_date, "%Y-%m-%d"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
+
+    n_days = (last_day.date() - first_day.date()).days + 1
+    if n_days < 1:
+        raise HTTPException(status_code=400, detail="start_date must be before end_date.")
+    if n_days > BATCH_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range is limited to {BATCH_MAX_DAYS} days.")
+    emails = list(dict.fromkeys(payload.emails))
+    if len(emails) > BATCH_MAX_USERS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_USERS} users per request.")
+
+    start_utc_naive, _, _ = _ist_day_bounds_to_utc_naive(first_day)
+    _, end_utc_naive, _ = _ist_day_bounds_to_utc_naive(last_day)
+
+    # 1️ Resolve every user in one query
+    result = await db.execute(select(User.id, User.email).where(User.email.in_(emails)))
+    ids_by_email = {email: user_id for user_id, email in result.all()}
+
+    # 2️ All windows for all users in one set-based query
+    result = await db.execute(
+        select(
+            RestingWindow.user_id,
+            RestingWindow.window_start,
+            RestingWindow.heart_rate,
+            RestingWindow.spo2,
+            RestingWindow.systolic_bp,
+            RestingWindow.diastolic_bp,
+        )
+        .where(
+            RestingWindow.user_id.in_(list(ids_by_email.values())),
+            RestingWindow.window_start >= start_utc_naive,
+            RestingWindow.window_start < end_utc_naive,
+        )
+        .order_by(RestingWindow.user_id, RestingWindow.window_start)
+    )
+    windows = pd.DataFrame(result.all(), columns=["user_id", "timestamp"] + FEATURE_COLUMNS)
+    if not windows.empty:
+        windows["day"] = (
+            pd.DatetimeIndex(pd.to_datetime(windows["timestamp"])).tz_localize("UTC").tz_convert(TZ).strftime("%Y-%m-%d")
+        )
+    windows_by_user = {user_id: frame for user_id, frame in windows.groupby("user_id")} if not windows.empty else {}
+
+    # 3️ Score each user's whole range with one vectorized predict
+    users_out = []
+    for email in emails:
+        user_id = ids_by_email.get(email)
+        if user_id is None:
+            users_out.append({"email": email, "status": "not_found"})
+            continue
+
+        frame = windows_by_user.get(user_id)
+        if frame is None or frame.empty:
+            users_out.append({"email": email, "user_id": user_id, "status": "no_data", "days": []})
+            continue
+
+        try:
+            loaded = await model_registry.get(user_id)
+        except ModelUpdatingError:
+            users_out.append({"email": email, "user_id": user_id, "status": "model_updating", "days": []})
+            continue
+        if loaded is None:
+            users_out.append({"email": email, "user_id": user_id, "status": "model_not_trained", "days": []})
+            continue
+        model, scaler = loaded
+
+        is_anomaly = model.predict(scaler.transform(frame[FEATURE_COLUMNS].values)) == -1
+        per_day = (
+            pd.DataFrame({"day": frame["day"].values, "is_anomaly": is_anomaly})
+            .groupby("day")["is_anomaly"]
+            .agg(["size", "sum"])
+        )
+
+        days = []
+        for day, total, anomalies in zip(per_day.index, per_day["size"].tolist(), per_day["sum"].tolist()):
+            if total < 3:
+                days.append({"date": day, "status": "insufficient", "total_records": total})
+                continue
+            percent = round((anomalies / total) * 100, 2)
+            days.append({
+                "date": day,
+                "status": "alert" if percent > 20 else "ok",
+                "total_records": total,
+                "anomalies": int(anomalies),
+                "percent_anomalies": percent,
+            })
+
+        users_out.append({"email": email, "user_id": user_id, "status": "ok", "days": days})
+
+    return {
+        "start_date": first_day.date().isoformat(),
+        "end_date": last_day.date().isoformat(),
+        "users": users_out,
+    }
+
+
+# ---------------------------------------------------
+# Model readiness status endpoint
+# ---------------------------------------------------
+@router.get("/personal_model_status", dependencies=[Depends(etag_validator(get_user_by_email, extra=_model_stamp))])
+async def personal_model_status(user: CachedUser = Depends(get_user_by_email)):
     user_folder = os.path.join(BASE_PATH, f"user_{user.id}")
     model_path = os.path.join(user_folder, "unsupervised_model.pkl")
     scaler_path = os.path.join(user_folder, "scaler.pkl")
@@ -279,14 +418,19 @@ async def personal_model_status(email: str, db: AsyncSession = Depends(get_db)):
     return {"trained": True, "message": "Personalized model ready"}
 
 
-@router.post("/personal_model/train")
-async def train_personal_model(email: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(User).where(User.email == email))
-    user = result.scalar_one_or_none()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+@router.get("/personal_model/retrain_eligibility")
+async def personal_model_retrain_eligibility(user: CachedUser = Depends(get_user_by_email), db: AsyncSession = Depends(get_db)):
+    return await get_retrain_eligibility(user.id, db)
+
 
-    await train_user_model(user.id, db)
+@router.post("/personal_model/train")
+async def train_personal_model(
+    user: CachedUser = Depends(get_user_by_email),
+    wait: bool = Query(False, description="Block until the training job finishes"),
+):
+    job = training_executor.submit(user.id)
+    if wait:
+        job = await training_executor.wait(user.id)
 
     user_folder = os.path.join(BASE_PATH, f"user_{user.id}")
     model_path = os.path.join(user_folder, "unsupervised_model.pkl")
@@ -295,9 +439,18 @@ async def train_personal_model(email: str, db: AsyncSession = Depends(get_db)):
 
     return {
         "user_id": user.id,
+        "job": job,
         "cwd": os.getcwd(),
         "user_folder": user_folder,
         "model_exists": os.path.exists(model_path),
         "scaler_exists": os.path.exists(scaler_path),
         "metadata_exists": os.path.exists(meta_path),
     }
+
+
+@router.get("/personal_model/train/status")
+async def train_personal_model_status(user: CachedUser = Depends(get_user_by_email)):
+    job = training_executor.status(user.id)
+    if not job:
+        return {"user_id": user.id, "status": "idle"}
+    return job
@@ -1,18 +1,9 @@
 # routers/user.py
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
-from models import User
-from database import get_db
+from fastapi import APIRouter, Depends
+from services.user_cache import CachedUser, get_user_by_email
 
 router = APIRouter()
 
 @router.get("/users/profile")
-async def get_user_profile(email: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(User).where(User.email == email))
-    user = result.scalar_one_or_none()
-
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    return user
+async def get_user_profile(user: CachedUser = Depends(get_user_by_email)):
+    return user.profile()
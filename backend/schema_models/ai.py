@@ -1,3 +1,4 @@
+from typing import List
 from pydantic import BaseModel
 
 class HealthMetrics(BaseModel):
@@ -5,3 +6,9 @@ class HealthMetrics(BaseModel):
     spo2: float
     systolic_bp: float
     diastolic_bp: float
+
+
+class BatchAnomalyRequest(BaseModel):
+    emails: List[str]
+    start_date: str  # YYYY-MM-DD (IST)
+    end_date: str    # YYYY-MM-DD (IST), inclusive
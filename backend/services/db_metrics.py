@@ -0,0 +1,130 @@
+# backend/services/db_metrics.py
+
+import contextvars
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class RequestDbStats:
+    """Database work done while serving one request."""
+
+    __slots__ = ("queries", "query_seconds", "checkouts", "checkout_wait_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.checkouts = 0
+        self.checkout_wait_seconds = 0.0
+
+    def server_timing(self) -> str:
+        return (
+            f'db;dur={self.query_seconds * 1000:.1f};desc="{self.queries} queries", '
+            f"db-wait;dur={self.checkout_wait_seconds * 1000:.1f}"
+        )
+
+
+_request_stats = contextvars.ContextVar("db_request_stats", default=None)
+
+
+class DbMetrics:
+    """
+    Process-wide query and pool-checkout counters, plus per-request stats
+    for whatever request is running in the current context. Work outside a
+    request (scheduler, training) only lands in the totals.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.checkouts = 0
+        self.checkout_wait_seconds = 0.0
+        self.max_checkout_wait_seconds = 0.0
+        self.checkout_timeouts = 0
+
+    def begin_request(self):
+        # The stats object is shared, not copied, with the tasks the request
+        # spawns, so their queries count towards it.
+        stats = RequestDbStats()
+        return stats, _request_stats.set(stats)
+
+    def end_request(self, token):
+        _request_stats.reset(token)
+
+    def record_query(self, seconds: float):
+        self.queries += 1
+        self.query_seconds += seconds
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.query_seconds += seconds
+
+    def record_checkout(self, seconds: float, timed_out: bool = False):
+        self.checkouts += 1
+        self.checkout_wait_seconds += seconds
+        self.max_checkout_wait_seconds = max(self.max_checkout_wait_seconds, seconds)
+        if timed_out:
+            self.checkout_timeouts += 1
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.checkouts += 1
+            stats.checkout_wait_seconds += seconds
+
+    def instrument(self, engine):
+        """Time every statement run through the (async) engine."""
+        sync_engine = getattr(engine, "sync_engine", engine)
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def _before(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def _after(conn, cursor, statement, parameters, context, executemany):
+            self.record_query(time.perf_counter() - conn.info["query_started"].pop())
+
+        @event.listens_for(sync_engine, "handle_error")
+        def _failed(context):
+            started = context.connection.info.get("query_started") if context.connection else None
+            if started:
+                self.record_query(time.perf_counter() - started.pop())
+
+    def status(self, engine) -> dict:
+        pool = getattr(engine, "sync_engine", engine).pool
+        status = {"pool_class": type(pool).__name__, "pool": pool.status()}
+        if isinstance(pool, AsyncAdaptedQueuePool):
+            status.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=pool.overflow(),
+            )
+        status.update(
+            queries=self.queries,
+            query_seconds=round(self.query_seconds, 3),
+            checkouts=self.checkouts,
+            avg_checkout_wait_ms=round(self.checkout_wait_seconds * 1000 / self.checkouts, 2) if self.checkouts else 0.0,
+            max_checkout_wait_ms=round(self.max_checkout_wait_seconds * 1000, 2),
+            checkout_timeouts=self.checkout_timeouts,
+        )
+        return status
+
+
+db_metrics = DbMetrics()
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    The default async queue pool, reporting how long each checkout took:
+    waiting for a free connection, opening a new one, and the pre-ping.
+    """
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            db_metrics.record_checkout(time.perf_counter() - started, timed_out=True)
+            raise
+        db_metrics.record_checkout(time.perf_counter() - started)
+        return connection
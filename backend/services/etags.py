@@ -0,0 +1,85 @@
+# backend/services/etags.py
+
+import hashlib
+import os
+from datetime import datetime
+
+from fastapi import Depends, HTTPException, Request
+import pytz
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from database import get_db
+from models import User
+from services.user_cache import CachedUser
+
+
+# Health data is per user and changes on every sync, so browsers may keep
+# it (private) but must revalidate before reuse.
+HTTP_CACHE_MAX_AGE_SECONDS = int(os.getenv("HTTP_CACHE_MAX_AGE_SECONDS", "0"))
+CACHE_CONTROL = f"private, max-age={HTTP_CACHE_MAX_AGE_SECONDS}, must-revalidate"
+
+
+def compute_etag(user_id: int, last_fit_sync_at: datetime, request: Request, *extra) -> str:
+    """
+    Strong ETag for a read of the user's data: synced data only changes
+    when a sync commits, so the sync watermark plus the exact request
+    identifies the payload.
+    """
+    watermark = last_fit_sync_at.isoformat() if last_fit_sync_at else "never"
+    query = sorted(request.query_params.multi_items())
+    key = repr((user_id, watermark, request.url.path, query, extra))
+    return '"' + hashlib.sha256(key.encode()).hexdigest()[:32] + '"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+def etag_validator(user_dependency, extra=None, rolling: bool = False):
+    """
+    Route dependency for conditional GETs. Answers 304 when the client's
+    If-None-Match still matches; otherwise leaves the tag on request.state
+    for the middleware to attach to the response.
+
+    extra(user) adds anything else the payload depends on (e.g. the model
+    version); rolling=True marks windows relative to now, which also roll
+    over with the IST date.
+
+    The watermark is read from the DB, not the cached user: only the worker
+    that ran a sync clears its own user cache, and a stale watermark on the
+    other workers would keep answering 304 for pre-sync data.
+    """
+    async def check(
+        request: Request,
+        user: CachedUser = Depends(user_dependency),
+        db: AsyncSession = Depends(get_db),
+    ):
+        last_fit_sync_at = (
+            await db.execute(select(User.last_fit_sync_at).where(User.id == user.id))
+        ).scalar()
+
+        parts = []
+        if extra:
+            parts.append(extra(user))
+        if rolling:
+            parts.append(datetime.now(pytz.timezone("Asia/Kolkata")).date().isoformat())
+
+        etag = compute_etag(user.id, last_fit_sync_at, request, *parts)
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _matches(if_none_match, etag):
+            raise HTTPException(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+        request.state.etag = etag
+
+    return check
+
+
+def apply_cache_headers(request: Request, response):
+    etag = getattr(request.state, "etag", None)
+    if etag and response.status_code == 200 and "etag" not in response.headers:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = CACHE_CONTROL
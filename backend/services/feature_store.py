@@ -0,0 +1,214 @@
+# backend/services/feature_store.py
+
+from datetime import date, datetime, timedelta, timezone
+
+import pandas as pd
+from sqlalchemy import and_, case, delete, func, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from models import HealthData, RestingWindow, SyncCheckpoint
+from utils.sql_time import bucket_index
+
+
+WINDOW_SECONDS = 300
+RESTING_METRICS = ["heart_rate", "spo2", "blood_pressure"]
+FEATURE_COLUMNS = ["heart_rate", "spo2", "systolic_bp", "diastolic_bp"]
+
+_INSERT_CHUNK = 1000
+
+# sync_checkpoints row recording that a user's windows were seeded from
+# their whole history, so an empty table is not rebuilt again.
+SEEDED_MARKER = "resting_windows"
+
+
+def _epoch(dt: datetime) -> int:
+    return int(dt.replace(tzinfo=timezone.utc).timestamp())
+
+
+def _align_down(dt: datetime) -> datetime:
+    epoch = _epoch(dt)
+    return datetime.utcfromtimestamp(epoch - epoch % WINDOW_SECONDS)
+
+
+async def refresh_resting_windows(db: AsyncSession, user_id: int, start_utc: datetime, end_utc: datetime) -> int:
+    """
+    Recompute the 5-minute resting windows overlapping [start_utc, end_utc)
+    from raw healthdata rows: mean heart rate, min SpO2, max systolic and
+    diastolic BP. Only complete windows (all four present) are stored, which
+    matches the old resample(...).dropna(). Does not commit.
+    """
+    dialect_name = db.get_bind().dialect.name
+    lo = _align_down(start_utc)
+    hi = _align_down(end_utc - timedelta(seconds=1)) + timedelta(seconds=WINDOW_SECONDS)
+    origin = _epoch(lo)
+    bucket = bucket_index(HealthData.timestamp, dialect_name, origin, WINDOW_SECONDS).label("bucket")
+
+    heart_rate = func.avg(case((HealthData.metric_type == "heart_rate", HealthData.value)))
+    spo2 = func.min(case((HealthData.metric_type == "spo2", HealthData.value)))
+    systolic = func.max(case((HealthData.metric_type == "blood_pressure", HealthData.systolic)))
+    diastolic = func.max(case((HealthData.metric_type == "blood_pressure", HealthData.diastolic)))
+
+    result = await db.execute(
+        select(bucket, heart_rate, spo2, systolic, diastolic)
+        .where(
+            HealthData.user_id == user_id,
+            HealthData.activity_type == "resting",
+            HealthData.metric_type.in_(RESTING_METRICS),
+            HealthData.timestamp >= lo,
+            HealthData.timestamp < hi,
+        )
+        .group_by(bucket)
+        .having(and_(
+            heart_rate.isnot(None),
+            spo2.isnot(None),
+            systolic.isnot(None),
+            diastolic.isnot(None),
+        ))
+    )
+
+    rows = [
+        {
+            "user_id": user_id,
+            "window_start": datetime.utcfromtimestamp(origin + int(b) * WINDOW_SECONDS),
+            "heart_rate": float(hr),
+            "spo2": float(o2),
+            "systolic_bp": float(sbp),
+            "diastolic_bp": float(dbp),
+        }
+        for b, hr, o2, sbp, dbp in result.all()
+    ]
+
+    await db.execute(
+        delete(RestingWindow).where(
+            RestingWindow.user_id == user_id,
+            RestingWindow.window_start >= lo,
+            RestingWindow.window_start < hi,
+        )
+    )
+    for i in range(0, len(rows), _INSERT_CHUNK):
+        await db.execute(insert(RestingWindow).values(rows[i:i + _INSERT_CHUNK]))
+
+    return len(rows)
+
+
+async def rebuild_resting_windows(db: AsyncSession, user_id: int) -> int:
+    """Rebuild a user's windows over their whole resting history. Does not commit."""
+    first_ts, last_ts = (
+        await db.execute(
+            select(func.min(HealthData.timestamp), func.max(HealthData.timestamp))
+            .where(
+                HealthData.user_id == user_id,
+                HealthData.activity_type == "resting",
+                HealthData.metric_type.in_(RESTING_METRICS),
+            )
+        )
+    ).one()
+    if not first_ts:
+        return 0
+    return await refresh_resting_windows(db, user_id, first_ts, last_ts + timedelta(seconds=1))
+
+
+async def count_resting_windows(db: AsyncSession, user_id: int) -> int:
+    return (
+        await db.execute(
+            select(func.count()).select_from(RestingWindow).where(RestingWindow.user_id == user_id)
+        )
+    ).scalar_one()
+
+
+async def seed_resting_windows(db: AsyncSession, user_id: int, force: bool = False):
+    """
+    Build the user's windows from their whole history once, on the write
+    paths (sync, backfill). Returns the window count, or None when the user
+    was already seeded. Does not commit.
+    """
+    marker = (
+        await db.execute(
+            select(SyncCheckpoint).where(
+                SyncCheckpoint.user_id == user_id,
+                SyncCheckpoint.metric_type == SEEDED_MARKER,
+            )
+        )
+    ).scalar_one_or_none()
+    if marker and not force:
+        return None
+
+    count = await rebuild_resting_windows(db, user_id)
+    now = datetime.utcnow()
+    if marker is None:
+        marker = SyncCheckpoint(user_id=user_id, metric_type=SEEDED_MARKER)
+        db.add(marker)
+    marker.synced_through = now
+    marker.updated_at = now
+    return count
+
+
+async def load_resting_windows(
+    db: AsyncSession,
+    user_id: int,
+    start_utc: datetime = None,
+    end_utc: datetime = None,
+) -> pd.DataFrame:
+    """
+    Stored windows as a DataFrame indexed by UTC-naive `timestamp`, columns
+    FEATURE_COLUMNS, ordered by time: the same frame the 5-minute resample
+    used to produce.
+    """
+    filters = [RestingWindow.user_id == user_id]
+    if start_utc is not None:
+        filters.append(RestingWindow.window_start >= start_utc)
+    if end_utc is not None:
+        filters.append(RestingWindow.window_start < end_utc)
+
+    result = await db.execute(
+        select(
+            RestingWindow.window_start,
+            RestingWindow.heart_rate,
+            RestingWindow.spo2,
+            RestingWindow.systolic_bp,
+            RestingWindow.diastolic_bp,
+        )
+        .where(*filters)
+        .order_by(RestingWindow.window_start)
+    )
+    rows = result.all()
+
+    if not rows:
+        return pd.DataFrame(columns=FEATURE_COLUMNS)
+
+    df = pd.DataFrame(rows, columns=["timestamp"] + FEATURE_COLUMNS)
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    df.set_index("timestamp", inplace=True)
+    return df
+
+
+async def resting_days_with_data(
+    db: AsyncSession,
+    user_id: int,
+    start_utc: datetime,
+    end_utc: datetime,
+    tz_offset_seconds: int,
+) -> dict:
+    """
+    {local date: resting row count} for [start_utc, end_utc), bucketed into
+    local days in SQL with one GROUP BY. tz_offset_seconds is the fixed UTC
+    offset of the local zone (19800 for Asia/Kolkata).
+    """
+    dialect_name = db.get_bind().dialect.name
+    day = bucket_index(HealthData.timestamp, dialect_name, -tz_offset_seconds, 86400).label("day")
+
+    result = await db.execute(
+        select(day, func.count())
+        .where(
+            HealthData.user_id == user_id,
+            HealthData.activity_type == "resting",
+            HealthData.metric_type.in_(RESTING_METRICS),
+            HealthData.timestamp >= start_utc,
+            HealthData.timestamp < end_utc,
+        )
+        .group_by(day)
+        .order_by(day)
+    )
+    epoch_day = date(1970, 1, 1)
+    return {epoch_day + timedelta(days=int(d)): n for d, n in result.all()}
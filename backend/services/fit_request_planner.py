@@ -0,0 +1,214 @@
+# backend/services/fit_request_planner.py
+
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+from routers.google_auth import DATA_TYPES
+
+
+# One dataset:aggregate call can cover several data types (one aggregateBy
+# entry each) over a multi-day range. Hourly buckets over MAX_DAYS days
+# keep responses well inside the API's limits.
+GOOGLE_FIT_AGGREGATE_MAX_DAYS = int(os.getenv("GOOGLE_FIT_AGGREGATE_MAX_DAYS", "10"))
+GOOGLE_FIT_AGGREGATE_MAX_TYPES = int(os.getenv("GOOGLE_FIT_AGGREGATE_MAX_TYPES", "8"))
+
+# Statuses about the call as a whole (credentials, scopes, quota), not one
+# of its data types: splitting would only repeat them once per type.
+WHOLE_CALL_STATUSES = {401, 403, 429}
+
+HOUR_MS = 3_600_000
+DAY_MS = 86_400_000
+ACTIVITY_DATA_TYPE = "com.google.activity.segment"
+
+
+def _millis(dt: datetime) -> int:
+    return int(dt.timestamp() * 1000)
+
+
+def _chunks(start_day: datetime, end_day: datetime, max_days: int):
+    cursor = start_day
+    while cursor < end_day:
+        chunk_end = min(end_day, cursor + timedelta(days=max_days))
+        yield cursor, chunk_end
+        cursor = chunk_end
+
+
+def plan_requests(
+    stream_start_day: dict,
+    end_day: datetime,
+    solo_keys=(),
+    max_days: int = GOOGLE_FIT_AGGREGATE_MAX_DAYS,
+    max_types: int = GOOGLE_FIT_AGGREGATE_MAX_TYPES,
+) -> list:
+    """
+    Pack every stream's [start day, end_day) range into as few requests as
+    the limits allow. Metrics sharing a start day share aggregate calls,
+    except solo_keys (types Google rejected before), which get their own;
+    activity segments are fetched from the earliest day any metric needs
+    (for labels); sessions get their own ranged list calls.
+
+    Each plan: {"kind": "aggregate" | "activity" | "sessions", "keys": [...],
+    "start": datetime, "end": datetime}.
+    """
+    max_days = max(1, max_days)
+    max_types = max(1, max_types)
+    plans = []
+
+    by_start = {}
+    for key in DATA_TYPES:
+        if key in stream_start_day:
+            by_start.setdefault(stream_start_day[key], []).append(key)
+
+    for start_day in sorted(by_start):
+        packed = [key for key in by_start[start_day] if key not in solo_keys]
+        groups = [packed[i:i + max_types] for i in range(0, len(packed), max_types)]
+        groups += [[key] for key in by_start[start_day] if key in solo_keys]
+        for chunk_start, chunk_end in _chunks(start_day, end_day, max_days):
+            for keys in groups:
+                plans.append({"kind": "aggregate", "keys": keys, "start": chunk_start, "end": chunk_end})
+
+    activity_starts = list(by_start)
+    if "activity" in stream_start_day:
+        activity_starts.append(stream_start_day["activity"])
+    if activity_starts:
+        for chunk_start, chunk_end in _chunks(min(activity_starts), end_day, max_days):
+            plans.append({"kind": "activity", "keys": ["activity"], "start": chunk_start, "end": chunk_end})
+
+    if "sessions" in stream_start_day:
+        for chunk_start, chunk_end in _chunks(stream_start_day["sessions"], end_day, max_days):
+            plans.append({"kind": "sessions", "keys": ["sessions"], "start": chunk_start, "end": chunk_end})
+
+    return plans
+
+
+def _rejects_type(status) -> bool:
+    return status is not None and 400 <= status < 500 and status not in WHOLE_CALL_STATUSES
+
+
+def _aggregate_body(data_types: list, start: datetime, end: datetime, bucket_ms: int) -> dict:
+    return {
+        "aggregateBy": [{"dataTypeName": data_type} for data_type in data_types],
+        "bucketByTime": {"durationMillis": bucket_ms},
+        "startTimeMillis": _millis(start),
+        "endTimeMillis": _millis(end),
+    }
+
+
+def _split_buckets(payload: dict, n_types: int, start: datetime) -> list:
+    """
+    Aggregate response -> per aggregateBy entry, {day index: [points]}.
+    Datasets inside each bucket follow the request's aggregateBy order, and
+    a bucket's day is taken from its start so points land on the same day
+    a one-day request would have returned them for.
+    """
+    start_ms = _millis(start)
+    split = [{} for _ in range(n_types)]
+    for bucket in payload.get("bucket", []):
+        day = (int(bucket["startTimeMillis"]) - start_ms) // DAY_MS
+        for i, dataset in enumerate(bucket.get("dataset", [])[:n_types]):
+            points = dataset.get("point", [])
+            if points:
+                split[i].setdefault(day, []).extend(points)
+    return split
+
+
+async def _run_aggregate(
+    send,
+    url: str,
+    keys: list,
+    start: datetime,
+    end: datetime,
+    bucket_ms: int,
+    data_types: list,
+    rejected: set = None,
+):
+    """
+    [(status, {day: points}) per key], splitting a rejected multi-type call
+    into single-type calls. Keys rejected on their own are added to rejected.
+    """
+    response = await send("POST", url, json=_aggregate_body(data_types, start, end, bucket_ms))
+    if response is not None and response.status_code == 200:
+        return [(200, split) for split in _split_buckets(response.json(), len(data_types), start)]
+
+    status = response.status_code if response is not None else None
+
+    # Any other 4xx on a packed call is usually one type the user has no
+    # data source for; retry per type so the others still sync.
+    if _rejects_type(status) and len(data_types) > 1:
+        results = await asyncio.gather(*[
+            _run_aggregate(send, url, [key], start, end, bucket_ms, [data_type], rejected)
+            for key, data_type in zip(keys, data_types)
+        ])
+        return [result[0] for result in results]
+
+    if rejected is not None and len(keys) == 1 and _rejects_type(status):
+        rejected.add(keys[0])
+    return [(status, {}) for _ in data_types]
+
+
+async def _run_sessions(send, url: str, start: datetime, end: datetime):
+    sessions = {}
+    page_token = None
+    while True:
+        params = {"startTime": start.isoformat() + "Z", "endTime": end.isoformat() + "Z"}
+        if page_token:
+            params["pageToken"] = page_token
+        response = await send("GET", url, params=params)
+        if response is None or response.status_code != 200:
+            return response.status_code if response is not None else None, {}
+
+        payload = response.json()
+        start_ms = _millis(start)
+        for session in payload.get("session", []):
+            day = max(0, (int(session["startTimeMillis"]) - start_ms) // DAY_MS)
+            sessions.setdefault(day, []).append(session)
+
+        page_token = payload.get("nextPageToken")
+        if not page_token or not payload.get("hasMoreData", True):
+            return 200, sessions
+
+
+async def fetch_planned(
+    send,
+    plans: list,
+    day_windows: list,
+    aggregate_url: str,
+    sessions_url: str,
+    rejected: set = None,
+) -> list:
+    """
+    Run every plan concurrently and return one entry per day window:
+    {"start_time", "end_time", "streams": set, "status": {stream: code},
+    "points": {stream: [...]}} - the same per-day, per-type view one request
+    per day and metric used to produce. A status of None means the request
+    never got a response. Types Google rejects individually are added to
+    rejected so the caller can plan them solo next time.
+    """
+    async def run(plan):
+        if plan["kind"] == "aggregate":
+            data_types = [DATA_TYPES[key] for key in plan["keys"]]
+            return await _run_aggregate(
+                send, aggregate_url, plan["keys"], plan["start"], plan["end"], HOUR_MS, data_types, rejected
+            )
+        if plan["kind"] == "activity":
+            return await _run_aggregate(send, aggregate_url, ["activity"], plan["start"], plan["end"], DAY_MS, [ACTIVITY_DATA_TYPE])
+        return [await _run_sessions(send, sessions_url, plan["start"], plan["end"])]
+
+    results = await asyncio.gather(*[run(plan) for plan in plans])
+
+    days = {
+        start: {"start_time": start, "end_time": end, "streams": set(), "status": {}, "points": {}}
+        for start, end in day_windows
+    }
+    for plan, per_key in zip(plans, results):
+        for key, (status, by_day) in zip(plan["keys"], per_key):
+            for offset, (start, _) in enumerate(_chunks(plan["start"], plan["end"], 1)):
+                day = days.get(start)
+                if day is None:
+                    continue
+                day["streams"].add(key)
+                day["status"][key] = status
+                day["points"][key] = by_day.get(offset, [])
+
+    return [days[start] for start, _ in day_windows]
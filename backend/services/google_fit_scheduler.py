@@ -0,0 +1,179 @@
+# backend/services/google_fit_scheduler.py
+
+import asyncio
+import os
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import httpx
+
+
+# Request budget for Google Fit, shared by every sync in this process
+# (global) and per user. A rate of 0 disables that bucket.
+GOOGLE_FIT_GLOBAL_RPS = float(os.getenv("GOOGLE_FIT_GLOBAL_RPS", "20"))
+GOOGLE_FIT_GLOBAL_BURST = int(os.getenv("GOOGLE_FIT_GLOBAL_BURST", "40"))
+GOOGLE_FIT_USER_RPS = float(os.getenv("GOOGLE_FIT_USER_RPS", "5"))
+GOOGLE_FIT_USER_BURST = int(os.getenv("GOOGLE_FIT_USER_BURST", "10"))
+
+GOOGLE_FIT_MAX_RETRIES = int(os.getenv("GOOGLE_FIT_MAX_RETRIES", "4"))
+GOOGLE_FIT_BACKOFF_BASE_SECONDS = float(os.getenv("GOOGLE_FIT_BACKOFF_BASE_SECONDS", "1"))
+GOOGLE_FIT_BACKOFF_MAX_SECONDS = float(os.getenv("GOOGLE_FIT_BACKOFF_MAX_SECONDS", "60"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_USER_BUCKET_IDLE_SECONDS = 600
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        # The lock queues waiters, so tokens are handed out in arrival order
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def retry_after_seconds(response: httpx.Response):
+    """Retry-After as seconds (delta-seconds or HTTP-date), or None."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class GoogleFitRequestScheduler:
+    """
+    Every Google Fit request goes through send(): it waits for a token from
+    the global and the user's bucket, retries 429/5xx and transport errors
+    with exponential backoff and full jitter (Retry-After wins when Google
+    sends one), and re-authenticates once on 401.
+    """
+
+    def __init__(
+        self,
+        global_rps: float = GOOGLE_FIT_GLOBAL_RPS,
+        global_burst: int = GOOGLE_FIT_GLOBAL_BURST,
+        user_rps: float = GOOGLE_FIT_USER_RPS,
+        user_burst: int = GOOGLE_FIT_USER_BURST,
+        max_retries: int = GOOGLE_FIT_MAX_RETRIES,
+    ):
+        self.global_bucket = TokenBucket(global_rps, global_burst)
+        self.user_rps = user_rps
+        self.user_burst = user_burst
+        self.max_retries = max(0, max_retries)
+        self._user_buckets = {}
+        self.retries = 0
+        self.throttled = 0
+
+    def _user_bucket(self, user_id: int) -> TokenBucket:
+        bucket = self._user_buckets.get(user_id)
+        if bucket is None:
+            if len(self._user_buckets) > 1000:
+                now = time.monotonic()
+                for uid in [u for u, b in self._user_buckets.items()
+                            if now - b.updated > _USER_BUCKET_IDLE_SECONDS and not b._lock.locked()]:
+                    del self._user_buckets[uid]
+            bucket = self._user_buckets[user_id] = TokenBucket(self.user_rps, self.user_burst)
+        return bucket
+
+    @staticmethod
+    def backoff_seconds(attempt: int) -> float:
+        ceiling = min(GOOGLE_FIT_BACKOFF_MAX_SECONDS, GOOGLE_FIT_BACKOFF_BASE_SECONDS * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    async def send(
+        self,
+        client: httpx.AsyncClient,
+        user_id: int,
+        method: str,
+        url: str,
+        headers: dict,
+        limiter: asyncio.Semaphore = None,
+        reauth=None,
+        **kwargs,
+    ) -> httpx.Response:
+        """
+        The final response (possibly still a 429/5xx once retries run out).
+        Transport errors are re-raised after the last attempt. reauth is
+        awaited with the rejected Authorization header and must update
+        headers in place.
+        """
+        user_bucket = self._user_bucket(user_id)
+        reauthed = False
+        attempt = 0
+
+        while True:
+            await self.global_bucket.acquire()
+            await user_bucket.acquire()
+
+            sent_with = headers.get("Authorization")
+            try:
+                if limiter:
+                    async with limiter:
+                        response = await client.request(method, url, headers=headers, **kwargs)
+                else:
+                    response = await client.request(method, url, headers=headers, **kwargs)
+            except httpx.TransportError:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.backoff_seconds(attempt)
+            else:
+                if response.status_code == 401 and reauth and not reauthed:
+                    await reauth(sent_with)
+                    reauthed = True
+                    continue
+                if response.status_code == 429:
+                    self.throttled += 1
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                retry_after = retry_after_seconds(response)
+                delay = (
+                    min(retry_after, GOOGLE_FIT_BACKOFF_MAX_SECONDS)
+                    if retry_after is not None
+                    else self.backoff_seconds(attempt)
+                )
+
+            attempt += 1
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        return {
+            "global_rps": self.global_bucket.rate,
+            "user_rps": self.user_rps,
+            "tracked_users": len(self._user_buckets),
+            "retries": self.retries,
+            "throttled": self.throttled,
+        }
+
+
+google_fit_scheduler = GoogleFitRequestScheduler()
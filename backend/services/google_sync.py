@@ -1,14 +1,46 @@
 # backend/services/google_sync.py
 
-from models import HealthData, User, SleepSession
+from models import User, SleepSession, SyncCheckpoint
 from datetime import datetime, timedelta
 import httpx
-from routers.google_auth import DATA_TYPES, GOOGLE_FIT_API_URL, build_request_body
+from routers.google_auth import DATA_TYPES, GOOGLE_FIT_API_URL
 from sqlalchemy.future import select
 from utils.fit_activity_map import ACTIVITY_MAP
-
-from services.train_user_model import train_user_model, should_retrain_user_model
+from utils.activity_index import ActivityIntervalIndex
+
+from services.healthdata_ingest import HealthDataBatch
+from services.http_client import get_http_client
+from services.token_manager import token_manager
+from services.user_cache import user_cache
+from services.response_cache import response_cache
+from services.google_fit_scheduler import google_fit_scheduler, RETRY_STATUSES
+from services.fit_request_planner import plan_requests, fetch_planned
+from services.health_rollups import ROLLUPS_ENABLED, refresh_rollups
+from services.feature_store import refresh_resting_windows, seed_resting_windows
+from services.train_user_model import should_retrain_user_model
+from services.training_executor import training_executor
+import asyncio
 import os
+import time
+
+import numpy as np
+
+
+GOOGLE_FIT_SESSIONS_URL = "https://www.googleapis.com/fitness/v1/users/me/sessions"
+
+# Upper bound on in-flight Google Fit requests during a single user's sync.
+# Set GOOGLE_FIT_MAX_CONCURRENCY=1 to fall back to one request at a time.
+GOOGLE_FIT_MAX_CONCURRENCY = int(os.getenv("GOOGLE_FIT_MAX_CONCURRENCY", "8"))
+
+# Everything a sync pulls, each with its own checkpoint
+SYNC_STREAMS = ["activity", "sessions"] + list(DATA_TYPES)
+
+# user id -> {data type: expires_at (monotonic)} for types Google rejected
+# (4xx) for that user; they are requested on their own so they can't fail
+# a packed aggregate call again. Entries expire so a transient rejection
+# doesn't disable batching for that type for good.
+GOOGLE_FIT_SOLO_TTL_SECONDS = float(os.getenv("GOOGLE_FIT_SOLO_TTL_SECONDS", str(6 * 3600)))
+_solo_keys = {}
 
 
 def to_utc_naive_from_millis(ms: int) -> datetime:
@@ -20,308 +52,365 @@ def to_utc_naive_from_nanos(ns: int) -> datetime:
     return datetime.utcfromtimestamp(ns / 1e9).replace(microsecond=0)
 
 
-async def sync_google_fit_data(user: User, db, days_back: int = 1):
+def _failure_reason(status) -> str:
+    return "request failed" if status is None else f"HTTP {status}"
+
+
+def _failed(status) -> bool:
+    """Worth retrying on the next sync: no response, throttled or a server error."""
+    return status is None or status in RETRY_STATUSES
+
+
+async def _load_checkpoints(db, user_id: int) -> dict:
+    result = await db.execute(select(SyncCheckpoint).where(SyncCheckpoint.user_id == user_id))
+    return {cp.metric_type: cp for cp in result.scalars().all()}
+
+
+async def sync_google_fit_data(
+    user: User,
+    db,
+    days_back: int = 1,
+    max_concurrency: int = None,
+    client: httpx.AsyncClient = None,
+):
     
     now = datetime.utcnow().replace(microsecond=0)
 
     
     overlap = timedelta(hours=12)
 
-    if user.last_fit_sync_at:
-        start_from = (user.last_fit_sync_at - overlap)
-    else:
-        start_from = (now - timedelta(days=days_back))
-
-    start_from = start_from.replace(microsecond=0)
+    # Each stream resumes from its own checkpoint; users synced before
+    # checkpoints existed fall back to last_fit_sync_at.
+    checkpoints = await _load_checkpoints(db, user.id)
+    stream_start_day = {}
+    for stream in SYNC_STREAMS:
+        cp = checkpoints.get(stream)
+        watermark = cp.synced_through if cp and cp.synced_through else user.last_fit_sync_at
+        if watermark:
+            start_from = (watermark - overlap)
+        else:
+            start_from = (now - timedelta(days=days_back))
+        stream_start_day[stream] = start_from.replace(hour=0, minute=0, second=0, microsecond=0)
 
     
-    day_cursor = start_from.replace(hour=0, minute=0, second=0)
+    day_cursor = min(stream_start_day.values())
     last_day = now.replace(hour=0, minute=0, second=0)
 
+    day_windows = []
+    while day_cursor <= last_day:
+        day_windows.append((day_cursor, day_cursor + timedelta(days=1)))
+        day_cursor += timedelta(days=1)
+
     added_rows = 0
 
-    async with httpx.AsyncClient() as client:
-        while day_cursor <= last_day:
-            start_time = day_cursor
-            end_time = start_time + timedelta(days=1)
+    client = client or get_http_client()
+    limiter = asyncio.Semaphore(max(1, max_concurrency or GOOGLE_FIT_MAX_CONCURRENCY))
 
-            start_millis = int(start_time.timestamp() * 1000)
-            end_millis = int(end_time.timestamp() * 1000)
+    # Refresh up front if the stored token is (nearly) expired
+    access_token = await token_manager.get_token(user, db, client)
+    headers = {"Authorization": f"Bearer {access_token}"}
 
-            headers = {"Authorization": f"Bearer {user.access_token}"}
+    async def reauth(rejected_auth: str):
+        # Single-flight per user: only the first 401 of the fan-out refreshes
+        token = await token_manager.get_token(user, db, client, stale_token=rejected_auth[len("Bearer "):])
+        headers["Authorization"] = f"Bearer {token}"
 
-            
-            # STEP 1: Fetch activity segments (for activity inference)
-            
-            activity_map_by_time = []
-
-            activity_body = {
-                "aggregateBy": [{"dataTypeName": "com.google.activity.segment"}],
-                "bucketByTime": {"durationMillis": 86400000},
-                "startTimeMillis": start_millis,
-                "endTimeMillis": end_millis,
-            }
-
-            activity_res = await client.post(
-                GOOGLE_FIT_API_URL,
-                headers=headers,
-                json=activity_body,
-                timeout=30.0
+    async def send(method: str, url: str, **kwargs):
+        try:
+            return await google_fit_scheduler.send(
+                client, user.id, method, url, headers, limiter=limiter, reauth=reauth, **kwargs
+            )
+        except httpx.TransportError as e:
+            print(f" Google Fit request failed for user {user.id}: {e!r}")
+            return None
+
+    # Pack every stream's range into a few multi-day, multi-type calls,
+    # run them concurrently (the limiter bounds how many are in flight) and
+    # split the answers back out per day. DB writes below stay sequential.
+    mono = time.monotonic()
+    solo_keys = {key: until for key, until in _solo_keys.get(user.id, {}).items() if until > mono}
+    rejected = set()
+    plans = plan_requests(stream_start_day, last_day + timedelta(days=1), set(solo_keys))
+    fetched_days = await fetch_planned(
+        send, plans, day_windows, GOOGLE_FIT_API_URL, GOOGLE_FIT_SESSIONS_URL, rejected=rejected
+    )
+    for key in rejected:
+        solo_keys[key] = time.monotonic() + GOOGLE_FIT_SOLO_TTL_SECONDS
+    if solo_keys:
+        _solo_keys[user.id] = solo_keys
+    else:
+        _solo_keys.pop(user.id, None)
+    print(f" Google Fit sync for {user.email}: {len(plans)} requests planned for {len(day_windows)} days")
+
+    # stream -> (start of the first day it failed on, reason)
+    first_failure = {}
+
+    def fail(stream: str, day_start: datetime, reason: str):
+        if stream not in first_failure:
+            first_failure[stream] = (day_start, reason)
+
+    for fetched in fetched_days:
+        start_time = fetched["start_time"]
+        end_time = fetched["end_time"]
+
+        
+        # STEP 1: Activity segments (for activity inference)
+        
+        activity_map_by_time = []
+
+        statuses = fetched["status"]
+        activity_failed = "activity" in fetched["streams"] and _failed(statuses["activity"])
+        if activity_failed:
+            fail("activity", start_time, _failure_reason(statuses["activity"]))
+
+        if statuses.get("activity") == 200:
+            for point in fetched["points"]["activity"]:
+                start_ms = int(point["startTimeNanos"]) // 1_000_000
+                end_ms = int(point["endTimeNanos"]) // 1_000_000
+                code = point["value"][0].get("intVal")
+                activity_type = ACTIVITY_MAP.get(code, "unknown")
+                activity_map_by_time.append({
+                    "start": to_utc_naive_from_millis(start_ms),
+                    "end": to_utc_naive_from_millis(end_ms),
+                    "activity": activity_type
+                })
+
+        # Built once per day window, shared by every metric below
+        activity_index = ActivityIntervalIndex(activity_map_by_time)
+
+       
+        # STEP 2: Sync each metric
+       
+        batch = HealthDataBatch(user.id)
+
+        for key in DATA_TYPES:
+            if key not in fetched["streams"]:
+                continue
+
+            if activity_failed:
+                # Rows inserted now would be labelled "resting" for good
+                # (inserts never overwrite), so retry the whole day later.
+                fail(key, start_time, "activity segments unavailable")
+                continue
+
+            status = statuses[key]
+            if _failed(status):
+                fail(key, start_time, _failure_reason(status))
+                continue
+
+            if status != 200:
+                print(f"Fetching {key} → status {status}")
+                continue
+
+            points = fetched["points"][key]
+            ts_ms_all = np.fromiter(
+                (int(point["startTimeNanos"]) // 1_000_000 for point in points),
+                dtype=np.int64,
+                count=len(points),
             )
+            activities = activity_index.label_array(ts_ms_all.astype("datetime64[ms]"))
 
-            if activity_res.status_code == 200:
-                for bucket in activity_res.json().get("bucket", []):
-                    for dataset in bucket.get("dataset", []):
-                        for point in dataset.get("point", []):
-                            start_ms = int(point["startTimeNanos"]) // 1_000_000
-                            end_ms = int(point["endTimeNanos"]) // 1_000_000
-                            code = point["value"][0].get("intVal")
-                            activity_type = ACTIVITY_MAP.get(code, "unknown")
-                            activity_map_by_time.append({
-                                "start": to_utc_naive_from_millis(start_ms),
-                                "end": to_utc_naive_from_millis(end_ms),
-                                "activity": activity_type
-                            })
-
-            def infer_activity(ts_dt: datetime) -> str:
+            for point, ts_ms, activity in zip(points, ts_ms_all.tolist(), activities):
+                ts_dt = to_utc_naive_from_millis(ts_ms)
+
+             
+                # blood_pressure
                
-                for seg in activity_map_by_time:
-                    if seg["start"] <= ts_dt <= seg["end"]:
-                        return seg["activity"]
-                return "resting"
-
-           
-            # STEP 2: Sync each metric
-           
-            for key, data_type in DATA_TYPES.items():
-                response = await client.post(
-                    GOOGLE_FIT_API_URL,
-                    headers=headers,
-                    json=build_request_body(data_type, start_millis, end_millis),
-                    timeout=30.0
-                )
+                if key == "blood_pressure":
+                    values = [
+                        v.get("fpVal")
+                        for v in point.get("value", [])
+                        if "fpVal" in v and isinstance(v.get("fpVal"), (int, float))
+                    ]
+                    if len(values) >= 2:
+                        values.sort(reverse=True)
+                        systolic = int(values[0])
+                        diastolic = int(values[-1])
+
+                        batch.add(
+                            key,
+                            ts_dt,
+                            systolic=systolic,
+                            diastolic=diastolic,
+                            activity_type=activity
+                        )
+                    continue
 
-                print(f"Fetching {key} → status {response.status_code}")
+                
+               
+               
+                if key == "sleep":
+                    sleep_stage = point["value"][0].get("intVal", 0)
+                    start_nanos = int(point["startTimeNanos"])
+                    end_nanos = int(point["endTimeNanos"])
+                    duration_sec = (end_nanos - start_nanos) / 1e9
+                    sleep_duration = duration_sec / 3600
+
+                    
+                    if sleep_stage in [2, 3, 4] and sleep_duration > 0:
+                        start_dt = to_utc_naive_from_nanos(start_nanos)
+                        end_dt = to_utc_naive_from_nanos(end_nanos)
+
+                        
+                        existing_sessions = await db.execute(
+                            select(SleepSession.start_time, SleepSession.end_time).where(
+                                SleepSession.user_id == user.id,
+                                SleepSession.start_time < end_time,
+                                SleepSession.end_time > start_time,
+                            )
+                        )
+                        existing_pairs = set(existing_sessions.all())
+                        pair = (start_dt, end_dt)
+                        if pair in existing_pairs:
+                            continue
+
+                        db.add(SleepSession(
+                            user_id=user.id,
+                            start_time=start_dt,
+                            end_time=end_dt,
+                            duration_hours=round(sleep_duration, 2),
+                        ))
+                        existing_pairs.add(pair)
+                        added_rows += 1
+                    continue
 
-                if response.status_code != 200:
+               
+                # distance
+                
+                if key == "distance":
+                    raw_val = point["value"][0]
+                    value = raw_val.get("fpVal") if raw_val.get("fpVal") is not None else raw_val.get("intVal")
+                    if value is not None and value > 0:
+                        batch.add(
+                            key,
+                            ts_dt,
+                            value=round(value / 1000, 2),  # meters -> km
+                            activity_type=activity
+                        )
                     continue
 
                 
-                existing_rows = await db.execute(
-                    select(HealthData.timestamp).where(
-                        HealthData.user_id == user.id,
-                        HealthData.metric_type == key,
-                        HealthData.timestamp >= start_time,
-                        HealthData.timestamp < end_time,
-                    )
-                )
-                existing_ts = set(existing_rows.scalars().all())
-
-                for bucket in response.json().get("bucket", []):
-                    for dataset in bucket.get("dataset", []):
-                        for point in dataset.get("point", []):
-                            ts_ms = int(point["startTimeNanos"]) // 1_000_000
-                            ts_dt = to_utc_naive_from_millis(ts_ms)
-                            activity = infer_activity(ts_dt)
-
-                            
-                            if ts_dt in existing_ts:
-                                continue
-
-                         
-                            # blood_pressure
-                           
-                            if key == "blood_pressure":
-                                values = [
-                                    v.get("fpVal")
-                                    for v in point.get("value", [])
-                                    if "fpVal" in v and isinstance(v.get("fpVal"), (int, float))
-                                ]
-                                if len(values) >= 2:
-                                    values.sort(reverse=True)
-                                    systolic = int(values[0])
-                                    diastolic = int(values[-1])
-
-                                    db.add(HealthData(
-                                        user_id=user.id,
-                                        metric_type=key,
-                                        systolic=systolic,
-                                        diastolic=diastolic,
-                                        timestamp=ts_dt,
-                                        activity_type=activity
-                                    ))
-                                    existing_ts.add(ts_dt)
-                                    added_rows += 1
-                                continue
-
-                            
-                           
-                           
-                            if key == "sleep":
-                                sleep_stage = point["value"][0].get("intVal", 0)
-                                start_nanos = int(point["startTimeNanos"])
-                                end_nanos = int(point["endTimeNanos"])
-                                duration_sec = (end_nanos - start_nanos) / 1e9
-                                sleep_duration = duration_sec / 3600
-
-                                
-                                if sleep_stage in [2, 3, 4] and sleep_duration > 0:
-                                    start_dt = to_utc_naive_from_nanos(start_nanos)
-                                    end_dt = to_utc_naive_from_nanos(end_nanos)
-
-                                    
-                                    existing_sessions = await db.execute(
-                                        select(SleepSession.start_time, SleepSession.end_time).where(
-                                            SleepSession.user_id == user.id,
-                                            SleepSession.start_time < end_time,
-                                            SleepSession.end_time > start_time,
-                                        )
-                                    )
-                                    existing_pairs = set(existing_sessions.all())
-                                    pair = (start_dt, end_dt)
-                                    if pair in existing_pairs:
-                                        continue
-
-                                    db.add(SleepSession(
-                                        user_id=user.id,
-                                        start_time=start_dt,
-                                        end_time=end_dt,
-                                        duration_hours=round(sleep_duration, 2),
-                                    ))
-                                    existing_pairs.add(pair)
-                                    added_rows += 1
-                                continue
-
-                           
-                            # distance
-                            
-                            if key == "distance":
-                                raw_val = point["value"][0]
-                                value = raw_val.get("fpVal") if raw_val.get("fpVal") is not None else raw_val.get("intVal")
-                                if value is not None and value > 0:
-                                    db.add(HealthData(
-                                        user_id=user.id,
-                                        metric_type=key,
-                                        value=round(value / 1000, 2),  # meters -> km
-                                        timestamp=ts_dt,
-                                        activity_type=activity
-                                    ))
-                                    existing_ts.add(ts_dt)
-                                    added_rows += 1
-                                continue
-
-                            
-                            # steps
-                         
-                            if key == "steps":
-                                value = point["value"][0].get("intVal")
-                                if value is not None:
-                                    db.add(HealthData(
-                                        user_id=user.id,
-                                        metric_type=key,
-                                        value=value,
-                                        timestamp=ts_dt,
-                                        activity_type=activity
-                                    ))
-                                    existing_ts.add(ts_dt)
-                                    added_rows += 1
-                                continue
-
-                            
-                            # stress
-                          
-                            if key == "stress":
-                                stress_val = point["value"][0].get("fpVal")
-                                if stress_val is not None:
-                                    db.add(HealthData(
-                                        user_id=user.id,
-                                        metric_type=key,
-                                        value=stress_val,
-                                        timestamp=ts_dt,
-                                        activity_type=activity
-                                    ))
-                                    existing_ts.add(ts_dt)
-                                    added_rows += 1
-                                continue
-
-                            
-                            # default numeric metrics
-                          
-                            value_dict = point["value"][0]
-                            value = value_dict.get("fpVal") if value_dict.get("fpVal") is not None else value_dict.get("intVal")
-                            if value is not None:
-                                db.add(HealthData(
-                                    user_id=user.id,
-                                    metric_type=key,
-                                    value=value,
-                                    timestamp=ts_dt,
-                                    activity_type=activity
-                                ))
-                                existing_ts.add(ts_dt)
-                                added_rows += 1
-
-           
-            # STEP 3: Sessions API for complete sleep sessions
-           
-            session_url = "https://www.googleapis.com/fitness/v1/users/me/sessions"
-            session_res = await client.get(
-                session_url,
-                headers=headers,
-                params={
-                    "startTime": start_time.isoformat() + "Z",
-                    "endTime": end_time.isoformat() + "Z"
-                },
-                timeout=30.0
-            )
+                # steps
+             
+                if key == "steps":
+                    value = point["value"][0].get("intVal")
+                    if value is not None:
+                        batch.add(key, ts_dt, value=value, activity_type=activity)
+                    continue
+
+                
+                # stress
+              
+                if key == "stress":
+                    stress_val = point["value"][0].get("fpVal")
+                    if stress_val is not None:
+                        batch.add(key, ts_dt, value=stress_val, activity_type=activity)
+                    continue
 
-            if session_res.status_code == 200:
-                sessions = session_res.json().get("session", [])
                 
-                existing_sessions = await db.execute(
-                    select(SleepSession.start_time, SleepSession.end_time).where(
-                        SleepSession.user_id == user.id,
-                        SleepSession.start_time < end_time,
-                        SleepSession.end_time > start_time,
-                    )
+                # default numeric metrics
+              
+                value_dict = point["value"][0]
+                value = value_dict.get("fpVal") if value_dict.get("fpVal") is not None else value_dict.get("intVal")
+                if value is not None:
+                    batch.add(key, ts_dt, value=value, activity_type=activity)
+
+        added_rows += await batch.flush(db)
+
+       
+        # STEP 3: Sessions API for complete sleep sessions
+       
+        if "sessions" in fetched["streams"] and _failed(statuses["sessions"]):
+            fail("sessions", start_time, _failure_reason(statuses["sessions"]))
+
+        if statuses.get("sessions") == 200:
+            sessions = fetched["points"]["sessions"]
+            
+            existing_sessions = await db.execute(
+                select(SleepSession.start_time, SleepSession.end_time).where(
+                    SleepSession.user_id == user.id,
+                    SleepSession.start_time < end_time,
+                    SleepSession.end_time > start_time,
                 )
-                existing_pairs = set(existing_sessions.all())
-
-                for s in sessions:
-                    if s.get("activityType") != 72:  # 72 = Sleep
-                        continue
-
-                    start_ms = int(s["startTimeMillis"])
-                    end_ms = int(s["endTimeMillis"])
-                    start_dt = to_utc_naive_from_millis(start_ms)
-                    end_dt = to_utc_naive_from_millis(end_ms)
-                    duration_hours = round((end_ms - start_ms) / 1000 / 3600, 2)
-
-                    pair = (start_dt, end_dt)
-                    if pair in existing_pairs:
-                        continue
-
-                    db.add(SleepSession(
-                        user_id=user.id,
-                        start_time=start_dt,
-                        end_time=end_dt,
-                        duration_hours=duration_hours
-                    ))
-                    existing_pairs.add(pair)
-                    added_rows += 1
-
-            day_cursor += timedelta(days=1)
-
-   
+            )
+            existing_pairs = set(existing_sessions.all())
+
+            for s in sessions:
+                if s.get("activityType") != 72:  # 72 = Sleep
+                    continue
+
+                start_ms = int(s["startTimeMillis"])
+                end_ms = int(s["endTimeMillis"])
+                start_dt = to_utc_naive_from_millis(start_ms)
+                end_dt = to_utc_naive_from_millis(end_ms)
+                duration_hours = round((end_ms - start_ms) / 1000 / 3600, 2)
+
+                pair = (start_dt, end_dt)
+                if pair in existing_pairs:
+                    continue
+
+                db.add(SleepSession(
+                    user_id=user.id,
+                    start_time=start_dt,
+                    end_time=end_dt,
+                    duration_hours=duration_hours
+                ))
+                existing_pairs.add(pair)
+                added_rows += 1
+
+    # Keep hour/day rollups in step with the rows committed below
+    if added_rows and ROLLUPS_ENABLED and day_windows:
+        await refresh_rollups(db, user.id, day_windows[0][0], day_windows[-1][1])
+
+    # Append/refresh the 5-minute resting feature windows for the same span;
+    # the first sync after the feature table appeared seeds full history.
+    seeded = await seed_resting_windows(db, user.id)
+    if seeded is None and added_rows and day_windows:
+        await refresh_resting_windows(db, user.id, day_windows[0][0], day_windows[-1][1])
+
+    # Advance each stream's watermark only as far as it fully succeeded
+    for stream in SYNC_STREAMS:
+        cp = checkpoints.get(stream)
+        if cp is None:
+            cp = SyncCheckpoint(user_id=user.id, metric_type=stream)
+            db.add(cp)
+        if stream in first_failure:
+            failed_day, reason = first_failure[stream]
+            if not cp.synced_through or cp.synced_through < failed_day:
+                cp.synced_through = failed_day
+            cp.last_error = reason
+        else:
+            cp.synced_through = now
+            cp.last_error = None
+        cp.updated_at = now
+
+    if first_failure:
+        print(f" Sync for {user.email} incomplete, will retry: {sorted(first_failure)}")
+
+    # Last completed sync; per-stream progress lives in sync_checkpoints
     user.last_fit_sync_at = now
 
     
     await db.commit()
+    user_cache.invalidate(email=user.email)
+    # Seeding rebuilt windows for all of history (past-day anomaly results
+    # may have been cached as "no_data"); otherwise only cached results
+    # reaching into the synced days can have changed.
+    if seeded is not None:
+        await response_cache.invalidate_user(user.id)
+    elif added_rows and day_windows:
+        await response_cache.invalidate_user(user.id, since=day_windows[0][0])
+
+    result = {
+        "added_rows": added_rows,
+        "failed_metrics": {stream: reason for stream, (_, reason) in first_failure.items()},
+    }
 
     
     try:
         if added_rows == 0:
             print(f"⏭️ No new rows synced for {user.email}, skipping training check")
-            return
+            return result
 
         backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
         model_base = os.path.join(backend_dir, "ml_models", "personalized", "users")
@@ -330,23 +419,16 @@ async def sync_google_fit_data(user: User, db, days_back: int = 1):
         scaler_path = os.path.join(user_folder, "scaler.pkl")
 
         if not (os.path.exists(model_path) and os.path.exists(scaler_path)):
-            await train_user_model(user.id, db)
-            print(f"Trained first personalized model for {user.email}")
+            training_executor.submit(user.id)
+            print(f"Queued first personalized model training for {user.email}")
         else:
             if await should_retrain_user_model(user.id, db):
-                await train_user_model(user.id, db)
-                print(f"Retrained personalized model for {user.email}")
+                training_executor.submit(user.id)
+                print(f"Queued personalized model retrain for {user.email}")
             else:
                 print(f"Skipped retrain for {user.email} (not enough new data / cooldown)")
 
     except Exception as e:
         print(f"Train/retrain failed for {user.email}: {e}")
 
-
-
-
-
-
-
-
-
+    return result
@@ -0,0 +1,240 @@
+# backend/services/health_aggregates.py
+
+import math
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, literal
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from models import HealthData, HealthDataRollup
+from services.health_rollups import pick_granularity, rollups_cover
+from utils.columnar import delta_encode
+from utils.sql_time import bucket_index
+
+
+METRICS_SUM = {"steps", "calories", "distance"}
+METRICS_AVG = {"heart_rate", "spo2", "stress"}
+SERIES_METRICS = ["heart_rate", "spo2", "blood_pressure", "steps", "distance", "calories", "sleep", "stress"]
+
+RESOLUTION_SECONDS = {
+    "1min": 60,
+    "5min": 300,
+    "15min": 900,
+    "hour": 3600,
+    "day": 86400,
+}
+
+
+def resolve_bucket_seconds(resolution: str, max_points: int, start_dt: datetime, end_dt: datetime):
+    """
+    Bucket width for a downsampled query, or None for raw rows.
+    An explicit resolution wins; otherwise max_points caps buckets per metric.
+    """
+    if resolution and resolution != "raw":
+        if resolution not in RESOLUTION_SECONDS:
+            raise ValueError(f"Unknown resolution '{resolution}'")
+        return RESOLUTION_SECONDS[resolution]
+
+    if max_points:
+        span = max(1, int((end_dt - start_dt).total_seconds()))
+        width = math.ceil(span / max_points)
+        return max(60, math.ceil(width / 60) * 60)  # whole minutes
+
+    return None
+
+
+def _round(value):
+    return round(value, 2) if value is not None else None
+
+
+def _average_metrics(totals: dict, bp_totals: list) -> dict:
+    """Build the dashboard averageMetrics block from per-metric [count, sum] and BP [count, sys_sum, dia_sum]."""
+    averageMetrics = {}
+    for metric in METRICS_SUM | METRICS_AVG:
+        n, total = totals.get(metric, (0, 0.0))
+        if not n:
+            averageMetrics[metric] = None
+        else:
+            averageMetrics[metric] = round(total if metric in METRICS_SUM else total / n, 2)
+
+    if bp_totals[0]:
+        averageMetrics["blood_pressure"] = {
+            "systolic": round(bp_totals[1] / bp_totals[0], 2),
+            "diastolic": round(bp_totals[2] / bp_totals[0], 2),
+        }
+    else:
+        averageMetrics["blood_pressure"] = None
+    return averageMetrics
+
+
+async def _bucket_query(db: AsyncSession, user_id: int, start_utc: datetime, end_utc: datetime, bucket_seconds: int = None):
+    """
+    Per-(metric, bucket) count/sum/min/max plus BP count/sums for
+    [start_utc, end_utc). Reads the hour/day rollups when the range and bucket
+    width line up with them and the user's rollups cover the range, raw
+    healthdata rows otherwise. With bucket_seconds=None everything falls
+    into bucket 0.
+    """
+    dialect_name = db.get_bind().dialect.name
+    origin = int(start_utc.replace(tzinfo=timezone.utc).timestamp())
+    granularity = pick_granularity(start_utc, bucket_seconds)
+    if granularity and not await rollups_cover(db, user_id, start_utc, granularity):
+        granularity = None
+
+    if granularity:
+        R = HealthDataRollup
+        columns = [
+            func.sum(R.value_count),
+            func.sum(R.value_sum),
+            func.min(R.value_min),
+            func.max(R.value_max),
+            func.sum(R.bp_count),
+            func.sum(R.systolic_sum),
+            func.sum(R.diastolic_sum),
+        ]
+        metric_col, ts_col = R.metric_type, R.bucket_start
+        filters = [R.user_id == user_id, R.granularity == granularity, ts_col >= start_utc, ts_col < end_utc]
+    else:
+        columns = [
+            func.count(HealthData.value),
+            func.sum(HealthData.value),
+            func.min(HealthData.value),
+            func.max(HealthData.value),
+            func.count(HealthData.systolic),
+            func.sum(HealthData.systolic),
+            func.sum(HealthData.diastolic),
+        ]
+        metric_col, ts_col = HealthData.metric_type, HealthData.timestamp
+        filters = [HealthData.user_id == user_id, ts_col >= start_utc, ts_col < end_utc]
+
+    if bucket_seconds:
+        bucket = bucket_index(ts_col, dialect_name, origin, bucket_seconds).label("bucket")
+        query = select(metric_col, bucket, *columns).where(*filters).group_by(metric_col, bucket).order_by(metric_col, bucket)
+    else:
+        query = select(metric_col, literal(0), *columns).where(*filters).group_by(metric_col)
+
+    return await db.execute(query), origin
+
+
+async def metric_summary(db: AsyncSession, user_id: int, start_utc: datetime, end_utc: datetime) -> dict:
+    """
+    averageMetrics for [start_utc, end_utc) from a single GROUP BY metric_type
+    over ix_healthdata_user_metric_ts (or the day/hour rollups), without
+    pulling the raw series.
+    """
+    result, _ = await _bucket_query(db, user_id, start_utc, end_utc)
+
+    totals = {}
+    bp_totals = [0, 0.0, 0.0]
+    for metric, _, n, total, _, _, n_bp, sys_sum, dia_sum in result.all():
+        if metric == "blood_pressure":
+            if n_bp:
+                bp_totals = [int(n_bp), float(sys_sum or 0), float(dia_sum or 0)]
+            continue
+        if metric in METRICS_SUM | METRICS_AVG and n:
+            totals[metric] = [int(n), float(total)]
+
+    return _average_metrics(totals, bp_totals)
+
+
+async def downsampled_history(
+    db: AsyncSession,
+    user_id: int,
+    start_utc: datetime,
+    end_utc: datetime,
+    bucket_seconds: int,
+) -> dict:
+    """
+    Per-metric time series bucketed in SQL, plus averageMetrics derived from
+    the bucket aggregates. Buckets are aligned to start_utc (UTC-naive), so
+    'day' buckets line up with the requested local day boundaries.
+
+    Each point carries the bucket start as `timestamp` (ms) and `value`
+    (sum for additive metrics, mean otherwise) with per-bucket min/max.
+    """
+    result, origin = await _bucket_query(db, user_id, start_utc, end_utc, bucket_seconds)
+
+    series = {metric: [] for metric in SERIES_METRICS}
+    totals = {}  # metric -> [count, sum]
+    bp_totals = [0, 0.0, 0.0]  # count, systolic sum, diastolic sum
+
+    for metric, b, n, total, lo, hi, n_bp, sys_sum, dia_sum in result.all():
+        if metric not in series:
+            continue
+        ts = (origin + int(b) * bucket_seconds) * 1000
+
+        if metric == "blood_pressure":
+            if not n_bp or sys_sum is None or dia_sum is None:
+                continue
+            n_bp = int(n_bp)
+            series[metric].append({
+                "timestamp": ts,
+                "systolic": _round(float(sys_sum) / n_bp),
+                "diastolic": _round(float(dia_sum) / n_bp),
+            })
+            bp_totals[0] += n_bp
+            bp_totals[1] += float(sys_sum)
+            bp_totals[2] += float(dia_sum)
+            continue
+
+        if not n:
+            continue
+        n = int(n)
+        total = float(total)
+        value = total if metric in METRICS_SUM else total / n
+        series[metric].append({
+            "timestamp": ts,
+            "value": _round(value),
+            "min": _round(float(lo)),
+            "max": _round(float(hi)),
+            "count": n,
+        })
+        acc = totals.setdefault(metric, [0, 0.0])
+        acc[0] += n
+        acc[1] += total
+
+    averageMetrics = _average_metrics(totals, bp_totals)
+
+    return {**series, "averageMetrics": averageMetrics, "bucket_seconds": bucket_seconds}
+
+
+async def raw_series_columns(db: AsyncSession, user_id: int, start_utc: datetime, end_utc: datetime) -> dict:
+    """
+    Raw per-metric series for [start_utc, end_utc) as parallel arrays:
+    {"timestamps": delta-encoded ms, "values": [...]}, or systolic/diastolic
+    arrays for blood pressure. Rows are read as plain tuples ordered by
+    timestamp and split with pandas, so no per-point objects are built.
+    Arrays are NumPy; serialize with ORJSONResponse.
+    """
+    result = await db.execute(
+        select(HealthData.metric_type, HealthData.timestamp, HealthData.value, HealthData.systolic, HealthData.diastolic)
+        .where(
+            HealthData.user_id == user_id,
+            HealthData.timestamp >= start_utc,
+            HealthData.timestamp < end_utc,
+        )
+        .order_by(HealthData.timestamp)
+    )
+    df = pd.DataFrame(result.all(), columns=["metric", "timestamp", "value", "systolic", "diastolic"])
+    ts_ms = pd.to_datetime(df["timestamp"]).to_numpy().astype("datetime64[ms]").astype(np.int64)
+
+    series = {}
+    for metric in SERIES_METRICS:
+        is_metric = (df["metric"] == metric).to_numpy()
+        if metric == "blood_pressure":
+            mask = is_metric & df["systolic"].notna().to_numpy() & df["diastolic"].notna().to_numpy()
+            series[metric] = {
+                "timestamps": delta_encode(ts_ms[mask]),
+                "systolic": df["systolic"].to_numpy(dtype=float)[mask],
+                "diastolic": df["diastolic"].to_numpy(dtype=float)[mask],
+            }
+        else:
+            mask = is_metric & df["value"].notna().to_numpy()
+            series[metric] = {
+                "timestamps": delta_encode(ts_ms[mask]),
+                "values": df["value"].to_numpy(dtype=float)[mask],
+            }
+    return series
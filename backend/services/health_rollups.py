@@ -0,0 +1,140 @@
+# backend/services/health_rollups.py
+
+import os
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, func, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from models import HealthData, HealthDataRollup
+from utils.sql_time import bucket_index
+
+
+ROLLUPS_ENABLED = os.getenv("HEALTH_ROLLUPS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+ROLLUP_GRANULARITIES = {
+    "hour": 3600,
+    "day": 86400,
+}
+
+# Buckets follow Asia/Kolkata (UTC+05:30, no DST) so day rollups match the
+# local days the dashboard asks for. Hour buckets therefore start at :30 UTC.
+ROLLUP_TZ_OFFSET_SECONDS = 19800
+
+_INSERT_CHUNK = 500
+
+
+def _epoch(dt: datetime) -> int:
+    return int(dt.replace(tzinfo=timezone.utc).timestamp())
+
+
+def align_down(dt: datetime, granularity: str) -> datetime:
+    width = ROLLUP_GRANULARITIES[granularity]
+    epoch = _epoch(dt)
+    return datetime.utcfromtimestamp(epoch - (epoch + ROLLUP_TZ_OFFSET_SECONDS) % width)
+
+
+def is_aligned(dt: datetime, granularity: str) -> bool:
+    return (_epoch(dt) + ROLLUP_TZ_OFFSET_SECONDS) % ROLLUP_GRANULARITIES[granularity] == 0
+
+
+def pick_granularity(start_utc: datetime, bucket_seconds: int = None):
+    """
+    Coarsest rollup that can answer a query starting at start_utc with the
+    given bucket width (None = one total over the range), or None if the
+    query has to go to raw rows.
+    """
+    if not ROLLUPS_ENABLED:
+        return None
+    for granularity in ("day", "hour"):
+        width = ROLLUP_GRANULARITIES[granularity]
+        if is_aligned(start_utc, granularity) and (bucket_seconds is None or bucket_seconds % width == 0):
+            return granularity
+    return None
+
+
+async def rollups_cover(db: AsyncSession, user_id: int, start_utc: datetime, granularity: str) -> bool:
+    """
+    Whether the user's rollups are complete from start_utc on. Syncs keep
+    rollups current from the first sync after they were deployed (from the
+    start of history once backfill_rollups.py has run), so anything before
+    the user's earliest bucket has to be read from raw rows.
+    """
+    earliest = (
+        await db.execute(
+            select(func.min(HealthDataRollup.bucket_start)).where(
+                HealthDataRollup.user_id == user_id,
+                HealthDataRollup.granularity == granularity,
+            )
+        )
+    ).scalar_one_or_none()
+    return earliest is not None and earliest <= start_utc
+
+
+async def refresh_rollups(db: AsyncSession, user_id: int, start_utc: datetime, end_utc: datetime) -> int:
+    """
+    Recompute every hour/day rollup bucket overlapping [start_utc, end_utc)
+    for one user from the raw healthdata rows. Idempotent; does not commit.
+    Returns the number of rollup rows written.
+    """
+    dialect_name = db.get_bind().dialect.name
+    written = 0
+
+    for granularity, width in ROLLUP_GRANULARITIES.items():
+        lo = align_down(start_utc, granularity)
+        hi = align_down(end_utc - timedelta(seconds=1), granularity) + timedelta(seconds=width)
+        origin = _epoch(lo)
+        bucket = bucket_index(HealthData.timestamp, dialect_name, origin, width).label("bucket")
+
+        result = await db.execute(
+            select(
+                HealthData.metric_type,
+                bucket,
+                func.count(HealthData.value),
+                func.sum(HealthData.value),
+                func.min(HealthData.value),
+                func.max(HealthData.value),
+                func.count(HealthData.systolic),
+                func.sum(HealthData.systolic),
+                func.sum(HealthData.diastolic),
+            )
+            .where(
+                HealthData.user_id == user_id,
+                HealthData.timestamp >= lo,
+                HealthData.timestamp < hi,
+            )
+            .group_by(HealthData.metric_type, bucket)
+        )
+
+        rows = [
+            {
+                "user_id": user_id,
+                "metric_type": metric,
+                "granularity": granularity,
+                "bucket_start": datetime.utcfromtimestamp(origin + int(b) * width),
+                "value_count": n or 0,
+                "value_sum": total,
+                "value_min": v_min,
+                "value_max": v_max,
+                "bp_count": n_bp or 0,
+                "systolic_sum": sys_sum,
+                "diastolic_sum": dia_sum,
+            }
+            for metric, b, n, total, v_min, v_max, n_bp, sys_sum, dia_sum in result.all()
+            if metric is not None
+        ]
+
+        await db.execute(
+            delete(HealthDataRollup).where(
+                HealthDataRollup.user_id == user_id,
+                HealthDataRollup.granularity == granularity,
+                HealthDataRollup.bucket_start >= lo,
+                HealthDataRollup.bucket_start < hi,
+            )
+        )
+        for i in range(0, len(rows), _INSERT_CHUNK):
+            await db.execute(insert(HealthDataRollup).values(rows[i:i + _INSERT_CHUNK]))
+        written += len(rows)
+
+    return written
@@ -0,0 +1,112 @@
+# backend/services/healthdata_ingest.py
+
+import os
+from datetime import datetime
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import HealthData
+
+
+HEALTHDATA_BATCH_SIZE = int(os.getenv("HEALTHDATA_BATCH_SIZE", "2000"))
+
+_COLUMNS = ("user_id", "metric_type", "timestamp", "value", "systolic", "diastolic", "activity_type")
+
+# Bind-parameter ceilings per statement (asyncpg / SQLite >= 3.32)
+_MAX_BIND_PARAMS = {
+    "postgresql": 32767,
+    "sqlite": 32766,
+}
+
+
+def _insert_ignore_duplicates(dialect_name: str, rows: list):
+    if dialect_name == "postgresql":
+        return (
+            pg_insert(HealthData)
+            .values(rows)
+            .on_conflict_do_nothing(constraint="uq_healthdata_user_metric_ts")
+        )
+    if dialect_name == "sqlite":
+        return (
+            sqlite_insert(HealthData)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=["user_id", "metric_type", "timestamp"])
+        )
+    raise NotImplementedError(f"Bulk HealthData ingest is not supported on {dialect_name}")
+
+
+class HealthDataBatch:
+    """
+    Columnar buffer of HealthData rows for one user.
+
+    Points are appended column-wise and written with one multi-row
+    INSERT ... ON CONFLICT DO NOTHING per chunk, so duplicates are dropped by
+    uq_healthdata_user_metric_ts instead of a pre-read SELECT.
+    """
+
+    def __init__(self, user_id: int, batch_size: int = HEALTHDATA_BATCH_SIZE):
+        self.user_id = user_id
+        self.batch_size = batch_size
+        self._columns = {c: [] for c in _COLUMNS[1:]}
+        self._keys = set()
+
+    def __len__(self) -> int:
+        return len(self._columns["timestamp"])
+
+    def add(
+        self,
+        metric_type: str,
+        timestamp: datetime,
+        value: float = None,
+        systolic: int = None,
+        diastolic: int = None,
+        activity_type: str = None,
+    ):
+        key = (metric_type, timestamp)
+        if key in self._keys:
+            return
+        self._keys.add(key)
+
+        cols = self._columns
+        cols["metric_type"].append(metric_type)
+        cols["timestamp"].append(timestamp)
+        cols["value"].append(value)
+        cols["systolic"].append(systolic)
+        cols["diastolic"].append(diastolic)
+        cols["activity_type"].append(activity_type)
+
+    def _rows(self, start: int, stop: int) -> list:
+        cols = self._columns
+        return [
+            {
+                "user_id": self.user_id,
+                "metric_type": cols["metric_type"][i],
+                "timestamp": cols["timestamp"][i],
+                "value": cols["value"][i],
+                "systolic": cols["systolic"][i],
+                "diastolic": cols["diastolic"][i],
+                "activity_type": cols["activity_type"][i],
+            }
+            for i in range(start, stop)
+        ]
+
+    async def flush(self, db) -> int:
+        """Write buffered rows and clear the buffer. Returns rows actually inserted."""
+        total = len(self)
+        if not total:
+            return 0
+
+        dialect_name = db.get_bind().dialect.name
+        max_rows = _MAX_BIND_PARAMS.get(dialect_name, 999) // len(_COLUMNS)
+        chunk = max(1, min(self.batch_size, max_rows))
+
+        inserted = 0
+        for start in range(0, total, chunk):
+            rows = self._rows(start, min(start + chunk, total))
+            result = await db.execute(_insert_ignore_duplicates(dialect_name, rows))
+            inserted += max(result.rowcount or 0, 0)
+
+        self._columns = {c: [] for c in _COLUMNS[1:]}
+        self._keys = set()
+        return inserted
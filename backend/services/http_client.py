@@ -0,0 +1,73 @@
+# backend/services/http_client.py
+
+import os
+from urllib.parse import urlsplit
+
+import httpx
+
+
+# One pooled client for every Google call (OAuth, userinfo, Fitness API), so
+# fleet sync reuses warm HTTP/2 connections instead of a TCP+TLS handshake
+# per request. Created in the app lifespan; scripts get one lazily.
+GOOGLE_HTTP2 = os.getenv("GOOGLE_HTTP2", "true").lower() in ("1", "true", "yes")
+GOOGLE_HTTP_MAX_CONNECTIONS = int(os.getenv("GOOGLE_HTTP_MAX_CONNECTIONS", "50"))
+GOOGLE_HTTP_MAX_KEEPALIVE = int(os.getenv("GOOGLE_HTTP_MAX_KEEPALIVE", "20"))
+GOOGLE_HTTP_KEEPALIVE_SECONDS = float(os.getenv("GOOGLE_HTTP_KEEPALIVE_SECONDS", "60"))
+GOOGLE_HTTP_CONNECT_TIMEOUT = float(os.getenv("GOOGLE_HTTP_CONNECT_TIMEOUT", "5"))
+GOOGLE_HTTP_POOL_TIMEOUT = float(os.getenv("GOOGLE_HTTP_POOL_TIMEOUT", "10"))
+
+# Read timeout per host: token/userinfo calls are quick, aggregate queries
+# over a day of hourly buckets can take a while.
+HOST_READ_TIMEOUTS = {
+    "oauth2.googleapis.com": 10.0,
+    "www.googleapis.com": 30.0,
+}
+DEFAULT_READ_TIMEOUT = 15.0
+
+_client = None
+
+
+def _timeout_for(host: str) -> httpx.Timeout:
+    read = HOST_READ_TIMEOUTS.get(host, DEFAULT_READ_TIMEOUT)
+    return httpx.Timeout(read, connect=GOOGLE_HTTP_CONNECT_TIMEOUT, pool=GOOGLE_HTTP_POOL_TIMEOUT)
+
+
+async def _apply_host_timeout(request: httpx.Request):
+    # The transport reads timeouts from the request extensions, so setting
+    # them here gives each host its own budget on the shared client.
+    request.extensions["timeout"] = _timeout_for(urlsplit(str(request.url)).hostname).as_dict()
+
+
+def create_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=GOOGLE_HTTP2,
+        limits=httpx.Limits(
+            max_connections=GOOGLE_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=GOOGLE_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=GOOGLE_HTTP_KEEPALIVE_SECONDS,
+        ),
+        timeout=_timeout_for(None),
+        event_hooks={"request": [_apply_host_timeout]},
+    )
+
+
+async def start_http_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_http_client()
+    return _client
+
+
+async def close_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """The shared client; also usable as a FastAPI dependency."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_http_client()
+    return _client
@@ -0,0 +1,130 @@
+# backend/services/model_registry.py
+
+import asyncio
+import os
+from collections import OrderedDict
+
+import joblib
+
+from services.train_user_model import _hours_since, _load_metadata, _user_folder
+
+
+MODEL_CACHE_MAX_ENTRIES = int(os.getenv("MODEL_CACHE_MAX_ENTRIES", "64"))
+MODEL_CACHE_MAX_MB = float(os.getenv("MODEL_CACHE_MAX_MB", "256"))
+# Loads that raced a training run's file swap are retried this many times
+MODEL_LOAD_ATTEMPTS = int(os.getenv("MODEL_LOAD_ATTEMPTS", "5"))
+MODEL_LOAD_RETRY_SECONDS = float(os.getenv("MODEL_LOAD_RETRY_SECONDS", "0.2"))
+# A "writing_since" mark this old belongs to a worker that died mid-save
+MODEL_WRITE_STALE_SECONDS = float(os.getenv("MODEL_WRITE_STALE_SECONDS", "60"))
+
+MODEL_FILE = "unsupervised_model.pkl"
+SCALER_FILE = "scaler.pkl"
+
+
+class ModelUpdatingError(RuntimeError):
+    """The user's model files kept changing while loading; retry shortly."""
+
+
+def _writing(metadata: dict) -> bool:
+    since = metadata.get("writing_since")
+    return since is not None and _hours_since(since) * 3600 < MODEL_WRITE_STALE_SECONDS
+
+
+class ModelRegistry:
+    """
+    In-process LRU of unpickled (model, scaler) pairs.
+
+    Entries are keyed on (user_id, metadata.json "last_trained"), so a retrain
+    naturally misses and replaces the stale pair. Memory is budgeted by the
+    on-disk pickle size, which tracks the unpickled footprint closely enough
+    to bound the cache.
+    """
+
+    def __init__(self, max_entries: int = MODEL_CACHE_MAX_ENTRIES, max_mb: float = MODEL_CACHE_MAX_MB):
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._entries = OrderedDict()   # (user_id, stamp) -> (model, scaler, size)
+        self._bytes = 0
+        self._locks = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _drop(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+
+    def invalidate(self, user_id: int):
+        for key in [k for k in self._entries if k[0] == user_id]:
+            self._drop(key)
+
+    async def get(self, user_id: int):
+        """
+        Return (model, scaler) for the user's current training run, or None
+        if untrained. Raises ModelUpdatingError if a training run kept
+        rewriting the files for every load attempt.
+        """
+        stamp = _load_metadata(user_id).get("last_trained")
+        key = (user_id, stamp)
+
+        entry = self._entries.get(key)
+        if entry:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1]
+
+        lock = self._locks.setdefault(user_id, asyncio.Lock())
+        async with lock:
+            entry = self._entries.get(key)
+            if entry:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0], entry[1]
+
+            user_folder = _user_folder(user_id)
+            model_path = os.path.join(user_folder, MODEL_FILE)
+            scaler_path = os.path.join(user_folder, SCALER_FILE)
+            if not os.path.exists(model_path) or not os.path.exists(scaler_path):
+                return None
+
+            self.misses += 1
+            # Seqlock on metadata.json: keep a pair only if the metadata was
+            # settled and unchanged across both loads.
+            for _ in range(MODEL_LOAD_ATTEMPTS):
+                before = _load_metadata(user_id)
+                if _writing(before):
+                    await asyncio.sleep(MODEL_LOAD_RETRY_SECONDS)
+                    continue
+                model, scaler = await asyncio.to_thread(
+                    lambda: (joblib.load(model_path), joblib.load(scaler_path))
+                )
+                if _load_metadata(user_id) == before:
+                    break
+                await asyncio.sleep(MODEL_LOAD_RETRY_SECONDS)
+            else:
+                raise ModelUpdatingError(f"Model files for user {user_id} kept changing while loading")
+            size = os.path.getsize(model_path) + os.path.getsize(scaler_path)
+            key = (user_id, before.get("last_trained"))
+
+            self.invalidate(user_id)
+            self._entries[key] = (model, scaler, size)
+            self._bytes += size
+            self._evict()
+            return model, scaler
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+model_registry = ModelRegistry()
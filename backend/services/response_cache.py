@@ -0,0 +1,286 @@
+# backend/services/response_cache.py
+
+import asyncio
+import hashlib
+import os
+import struct
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import orjson
+from fastapi import Response
+
+
+# memory (per-process LRU, default) | disk | redis (any Redis-compatible
+# server; needs the optional `redis` package) | off
+#
+# Invalidations are stored in the backend, so only disk (one host) and redis
+# reach every uvicorn/gunicorn worker. With memory, a sync clears only its
+# own worker's entries; the others keep serving ranges near the present
+# until RESPONSE_CACHE_LIVE_TTL_SECONDS. Run several workers on disk or
+# redis to get sync-exact invalidation everywhere.
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory").lower()
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+RESPONSE_CACHE_MAX_MB = float(os.getenv("RESPONSE_CACHE_MAX_MB", "128"))
+RESPONSE_CACHE_DIR = os.getenv(
+    "RESPONSE_CACHE_DIR",
+    os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")), "response_cache"),
+)
+RESPONSE_CACHE_REDIS_URL = os.getenv("RESPONSE_CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+# Entries normally live until a sync invalidates them; the TTL only stops
+# disk/redis from keeping results for users who stopped syncing.
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", str(7 * 86400)))
+# For windows relative to now (weekly sleep), which drift without a sync
+RESPONSE_CACHE_ROLLING_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_ROLLING_TTL_SECONDS", "300"))
+# Memory backend only: entries covering data this recent, which the next
+# sync (on any worker) may rewrite, expire after the live TTL. A sync
+# re-reads from its checkpoint minus 12h, rounded down to the UTC day.
+RESPONSE_CACHE_LIVE_WINDOW_SECONDS = int(os.getenv("RESPONSE_CACHE_LIVE_WINDOW_SECONDS", str(2 * 86400)))
+RESPONSE_CACHE_LIVE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_LIVE_TTL_SECONDS", "60"))
+
+_HEADER = struct.Struct("dd")   # created_at, data_until (inf = open-ended)
+_LOG_MAX_ITEMS = 32
+
+
+class MemoryBackend:
+    shared = False  # invalidations don't reach other processes
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, max_mb: float = RESPONSE_CACHE_MAX_MB):
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._entries = OrderedDict()   # key -> (value, expires_at)
+        self._bytes = 0
+
+    async def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            await self.delete(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        await self.delete(key)
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._bytes += len(value)
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, (old_value, _) = self._entries.popitem(last=False)
+            self._bytes -= len(old_value)
+
+    async def delete(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[0])
+
+
+class DiskBackend:
+    """One file per key: 8-byte expiry, then the value. Shared by workers on one host."""
+
+    _PRUNE_EVERY = 256
+    shared = True
+
+    def __init__(self, directory: str = RESPONSE_CACHE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._writes = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest())
+
+    def _read(self, path: str):
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        if len(data) < 8 or struct.unpack("d", data[:8])[0] <= time.time():
+            return None
+        return data[8:]
+
+    def _write(self, path: str, value: bytes, ttl: float):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(struct.pack("d", time.time() + ttl) + value)
+        os.replace(tmp, path)
+
+    def _prune(self):
+        now = time.time()
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, "rb") as f:
+                    header = f.read(8)
+                if len(header) < 8 or struct.unpack("d", header)[0] <= now:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    async def get(self, key: str):
+        return await asyncio.to_thread(self._read, self._path(key))
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        await asyncio.to_thread(self._write, self._path(key), value, ttl)
+        self._writes += 1
+        if self._writes % self._PRUNE_EVERY == 0:
+            await asyncio.to_thread(self._prune)
+
+    async def delete(self, key: str):
+        try:
+            await asyncio.to_thread(os.remove, self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+class RedisBackend:
+    shared = True
+
+    def __init__(self, url: str = RESPONSE_CACHE_REDIS_URL):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis requires the 'redis' package (pip install redis)")
+        self._redis = redis.from_url(url)
+
+    async def get(self, key: str):
+        return await self._redis.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        await self._redis.set(key, value, ex=max(1, int(ttl)))
+
+    async def delete(self, key: str):
+        await self._redis.delete(key)
+
+
+def _epoch(dt: datetime) -> float:
+    return dt.replace(tzinfo=timezone.utc).timestamp()
+
+
+class ResponseCache:
+    """
+    JSON response bodies per user, on a pluggable backend.
+
+    Each entry records when its computation started and the latest data
+    time it covers (data_until, UTC naive; None for open-ended windows). A
+    sync that wrote rows from `since` onwards logs (now, since) for the
+    user; entries computed before that and covering data at or after
+    `since` are stale, while older ranges (past days) stay valid, so they
+    are computed once per model/query.
+    """
+
+    def __init__(self, backend=None, ttl_seconds: int = RESPONSE_CACHE_TTL_SECONDS):
+        self.backend = backend
+        self.ttl = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    @staticmethod
+    def _entry_key(user_id: int, key_parts) -> str:
+        return f"resp:{user_id}:{hashlib.sha256(repr(key_parts).encode()).hexdigest()}"
+
+    @staticmethod
+    def _log_key(user_id: int) -> str:
+        return f"resp-invalidations:{user_id}"
+
+    async def _load_log(self, user_id: int):
+        raw = await self.backend.get(self._log_key(user_id))
+        return orjson.loads(raw) if raw else None
+
+    async def _save_log(self, user_id: int, log: dict):
+        # Outlives every entry, so a missing log always means "start over"
+        await self.backend.set(self._log_key(user_id), orjson.dumps(log), self.ttl * 2)
+
+    def _valid(self, log, created_at: float, data_until: float) -> bool:
+        # No log (never written or evicted): nothing can be vouched for
+        if log is None or created_at < log["floor"]:
+            return False
+        return all(since >= data_until for at, since in log["items"] if at >= created_at)
+
+    async def get_or_compute(self, user_id: int, key_parts, data_until: datetime, compute, ttl: int = None) -> Response:
+        """
+        The cached JSON response for key_parts, or compute() (a dict or a
+        JSON Response) stored and returned as one.
+        """
+        if self.backend is None:
+            return _as_response(await compute())
+
+        key = self._entry_key(user_id, key_parts)
+        until = _epoch(data_until) if data_until else float("inf")
+
+        raw = await self.backend.get(key)
+        log = await self._load_log(user_id)
+        if raw is not None:
+            created_at, entry_until = _HEADER.unpack_from(raw)
+            if self._valid(log, created_at, entry_until):
+                self.hits += 1
+                return Response(content=raw[_HEADER.size:], media_type="application/json")
+            self.stale += 1
+
+        self.misses += 1
+        # Stamped before computing, so a sync committing mid-computation
+        # still invalidates this entry.
+        started = time.time()
+        response = _as_response(await compute())
+        if response.status_code == 200:
+            if log is None and await self._load_log(user_id) is None:
+                await self._save_log(user_id, {"floor": started, "items": []})
+            ttl = ttl or self.ttl
+            if not self.backend.shared and until > started - RESPONSE_CACHE_LIVE_WINDOW_SECONDS:
+                ttl = min(ttl, RESPONSE_CACHE_LIVE_TTL_SECONDS)
+            await self.backend.set(key, _HEADER.pack(started, until) + bytes(response.body), ttl)
+        return response
+
+    async def invalidate_user(self, user_id: int, since: datetime = None):
+        """Drop the user's entries covering data at or after since (all of them if None)."""
+        if self.backend is None:
+            return
+        now = time.time()
+        log = await self._load_log(user_id)
+        if log is None:
+            # Also covers entries whose computation is still running
+            await self._save_log(user_id, {"floor": now, "items": []})
+            return
+        # since=None stales every entry: all of them cover data after 1970
+        log["items"].append([now, _epoch(since) if since else 0.0])
+        if len(log["items"]) > _LOG_MAX_ITEMS:
+            dropped = log["items"][:-_LOG_MAX_ITEMS]
+            log["items"] = log["items"][-_LOG_MAX_ITEMS:]
+            # Entries older than what the log still remembers are dropped too
+            log["floor"] = max(log["floor"], max(at for at, _ in dropped))
+        await self._save_log(user_id, log)
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__ if self.backend else "off",
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+        }
+
+
+def _as_response(result) -> Response:
+    if isinstance(result, Response):
+        return result
+    return Response(
+        content=orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS),
+        media_type="application/json",
+    )
+
+
+def create_backend(name: str = RESPONSE_CACHE_BACKEND):
+    if name == "off":
+        return None
+    if name == "disk":
+        return DiskBackend()
+    if name == "redis":
+        return RedisBackend()
+    if name != "memory":
+        print(f" Unknown RESPONSE_CACHE_BACKEND={name!r}, using memory")
+    return MemoryBackend()
+
+
+response_cache = ResponseCache(create_backend())
@@ -0,0 +1,196 @@
+# backend/services/sync_scheduler.py
+
+import asyncio
+import itertools
+import os
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy.future import select
+
+from database import async_session
+from models import User
+from services.google_sync import sync_google_fit_data
+from services.google_fit_scheduler import google_fit_scheduler
+from services.train_user_model import BASE_PATH
+from services.training_executor import training_executor
+
+
+SYNC_WORKERS = int(os.getenv("SYNC_WORKERS", "2"))
+SYNC_INTERVAL_MINUTES = int(os.getenv("SYNC_INTERVAL_MINUTES", "60"))     # how stale a user may get
+SYNC_POLL_SECONDS = int(os.getenv("SYNC_POLL_SECONDS", "60"))             # how often we look for due users
+SYNC_JITTER_SECONDS = float(os.getenv("SYNC_JITTER_SECONDS", "15"))       # random delay before each job
+SYNC_BACKOFF_BASE_SECONDS = float(os.getenv("SYNC_BACKOFF_BASE_SECONDS", "60"))
+SYNC_BACKOFF_MAX_SECONDS = float(os.getenv("SYNC_BACKOFF_MAX_SECONDS", "3600"))
+
+
+def _model_exists(user_id: int) -> bool:
+    user_folder = os.path.join(BASE_PATH, f"user_{user_id}")
+    model_path = os.path.join(user_folder, "unsupervised_model.pkl")
+    scaler_path = os.path.join(user_folder, "scaler.pkl")
+    return os.path.exists(model_path) and os.path.exists(scaler_path)
+
+
+class SyncScheduler:
+    """
+    Background Google Fit sync for every connected user.
+
+    The durable queue is `User.last_fit_sync_at`: every poll re-reads the users
+    whose last sync is older than SYNC_INTERVAL_MINUTES (never-synced first,
+    then stalest first) and feeds them to a fixed pool of workers. Failed users
+    are retried with exponential backoff instead of blocking the fleet.
+    """
+
+    def __init__(self, workers: int = SYNC_WORKERS, interval_minutes: int = SYNC_INTERVAL_MINUTES):
+        self.workers = max(1, workers)
+        self.interval = timedelta(minutes=interval_minutes)
+
+        self._queue = asyncio.PriorityQueue()
+        self._seq = itertools.count()
+        self._queued = set()        # user ids waiting in the queue
+        self._running = {}          # worker index -> user id
+        self._backoff = {}          # user id -> (failures, retry_at)
+        self._last_result = {}      # user id -> last job outcome
+        self._tasks = []
+        self._started_at = None
+
+    # ---------------------------------------------------
+    # Lifecycle
+    # ---------------------------------------------------
+    def start(self):
+        if self._tasks:
+            return
+        self._started_at = datetime.utcnow()
+        self._tasks.append(asyncio.create_task(self._poll_loop()))
+        for n in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(n)))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # ---------------------------------------------------
+    # Queueing
+    # ---------------------------------------------------
+    def enqueue(self, user_id: int, last_sync_at: datetime = None) -> bool:
+        if user_id in self._queued or user_id in self._running.values():
+            return False
+        # Never-synced users sort before everyone else, then stalest first.
+        priority = last_sync_at or datetime.min
+        self._queue.put_nowait((priority, next(self._seq), user_id))
+        self._queued.add(user_id)
+        return True
+
+    async def enqueue_due_users(self) -> int:
+        now = datetime.utcnow()
+        cutoff = now - self.interval
+
+        async with async_session() as db:
+            result = await db.execute(
+                select(User.id, User.last_fit_sync_at)
+                .where(
+                    User.access_token.isnot(None),
+                    (User.last_fit_sync_at.is_(None)) | (User.last_fit_sync_at < cutoff),
+                )
+                .order_by(User.last_fit_sync_at.asc().nulls_first())
+            )
+            rows = result.all()
+
+        added = 0
+        for user_id, last_sync_at in rows:
+            failures_retry = self._backoff.get(user_id)
+            if failures_retry and failures_retry[1] > now:
+                continue
+            if self.enqueue(user_id, last_sync_at):
+                added += 1
+        return added
+
+    async def _poll_loop(self):
+        while True:
+            try:
+                added = await self.enqueue_due_users()
+                if added:
+                    print(f" Sync scheduler queued {added} users")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f" Sync scheduler poll failed: {e}")
+            await asyncio.sleep(SYNC_POLL_SECONDS)
+
+    # ---------------------------------------------------
+    # Workers
+    # ---------------------------------------------------
+    async def _worker(self, n: int):
+        while True:
+            _, _, user_id = await self._queue.get()
+            # Claimed before the jitter sleep so the poll loop can't queue
+            # the user again while this worker waits.
+            self._running[n] = user_id
+            self._queued.discard(user_id)
+            try:
+                if SYNC_JITTER_SECONDS > 0:
+                    await asyncio.sleep(random.uniform(0, SYNC_JITTER_SECONDS))
+                result = await self._sync_user(user_id)
+                self._backoff.pop(user_id, None)
+                self._last_result[user_id] = {"status": "ok", "at": datetime.utcnow().isoformat()}
+                if result and result["failed_metrics"]:
+                    self._last_result[user_id].update(status="partial", failed_metrics=result["failed_metrics"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failures = self._backoff.get(user_id, (0, None))[0] + 1
+                delay = min(SYNC_BACKOFF_MAX_SECONDS, SYNC_BACKOFF_BASE_SECONDS * (2 ** (failures - 1)))
+                delay = random.uniform(delay / 2, delay)
+                retry_at = datetime.utcnow() + timedelta(seconds=delay)
+                self._backoff[user_id] = (failures, retry_at)
+                self._last_result[user_id] = {
+                    "status": "failed",
+                    "at": datetime.utcnow().isoformat(),
+                    "error": str(e),
+                    "retry_at": retry_at.isoformat(),
+                }
+                print(f" Background sync failed for user {user_id} (attempt {failures}): {e}")
+            finally:
+                self._running.pop(n, None)
+                self._queue.task_done()
+
+    async def _sync_user(self, user_id: int):
+        async with async_session() as db:
+            user = await db.get(User, user_id)
+            if not user or not user.access_token:
+                return
+
+            result = await sync_google_fit_data(user, db)
+            print(f" Synced data for {user.email}")
+
+            # First-time setup: train if no model exists yet
+            if not _model_exists(user.id):
+                training_executor.submit(user.id)
+                print(f" Queued first personalized model training for {user.email}")
+
+            return result
+
+    # ---------------------------------------------------
+    # Introspection
+    # ---------------------------------------------------
+    def status(self) -> dict:
+        now = datetime.utcnow()
+        return {
+            "running": bool(self._tasks),
+            "started_at": self._started_at.isoformat() if self._started_at else None,
+            "workers": self.workers,
+            "interval_minutes": int(self.interval.total_seconds() // 60),
+            "queued": self._queue.qsize(),
+            "in_progress": sorted(self._running.values()),
+            "backing_off": {
+                user_id: {"failures": failures, "retry_in_seconds": max(0, int((retry_at - now).total_seconds()))}
+                for user_id, (failures, retry_at) in self._backoff.items()
+            },
+            "last_results": self._last_result,
+            "google_fit": google_fit_scheduler.stats(),
+        }
+
+
+sync_scheduler = SyncScheduler()
@@ -0,0 +1,86 @@
+# backend/services/token_manager.py
+
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+
+from models import User
+from routers.google_auth import refresh_access_token, expires_at_from
+
+
+# Refresh this long before Google's expiry so a sync never starts on a
+# token that dies halfway through its fan-out.
+TOKEN_REFRESH_MARGIN_SECONDS = int(os.getenv("GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS", "300"))
+
+
+class TokenManager:
+    """
+    Google access tokens per user, refreshed before expiry.
+
+    Refreshes are single-flight: concurrent callers for the same user (the
+    fan-out of one sync, or a manual sync racing the scheduler) wait on one
+    lock and reuse the token the first caller obtained. The newest token is
+    cached in memory and persisted on the user row.
+    """
+
+    def __init__(self, margin_seconds: int = TOKEN_REFRESH_MARGIN_SECONDS):
+        self.margin = timedelta(seconds=margin_seconds)
+        self._locks = {}
+        self._tokens = {}   # user id -> (access token, expires_at)
+
+    def _fresh(self, expires_at) -> bool:
+        # Rows from before expiry tracking have no expiry; trust them until a 401.
+        return expires_at is None or expires_at - self.margin > datetime.utcnow()
+
+    def store(self, user: User):
+        """Remember a token written elsewhere (e.g. the OAuth callback)."""
+        if user.access_token:
+            self._tokens[user.id] = (user.access_token, user.token_expires_at)
+
+    async def get_token(self, user: User, db, client=None, stale_token: str = None) -> str:
+        """
+        A usable access token for the user. Pass stale_token (the token a
+        request was just rejected with) to force a refresh unless someone
+        else already replaced it.
+        """
+        cached = self._tokens.get(user.id)
+        if cached and cached[0] != stale_token and self._fresh(cached[1]):
+            self._adopt(user, *cached)
+            return cached[0]
+        if not cached and user.access_token and user.access_token != stale_token and self._fresh(user.token_expires_at):
+            self.store(user)
+            return user.access_token
+
+        lock = self._locks.setdefault(user.id, asyncio.Lock())
+        async with lock:
+            # Whoever held the lock before us may have refreshed already
+            cached = self._tokens.get(user.id)
+            if cached and cached[0] != stale_token and self._fresh(cached[1]):
+                self._adopt(user, *cached)
+                return cached[0]
+
+            if not user.refresh_token:
+                raise HTTPException(status_code=401, detail="Google token expired and no refresh token is stored")
+
+            token_json = await refresh_access_token(user.refresh_token, client)
+
+            user.access_token = token_json["access_token"]
+            user.token_expires_at = expires_at_from(token_json)
+            if token_json.get("refresh_token"):
+                user.refresh_token = token_json["refresh_token"]
+            await db.commit()
+
+            self.store(user)
+            print(f" Refreshed Google access token for user {user.id}")
+            return user.access_token
+
+    @staticmethod
+    def _adopt(user: User, token: str, expires_at):
+        if user.access_token != token:
+            user.access_token = token
+            user.token_expires_at = expires_at
+
+
+token_manager = TokenManager()
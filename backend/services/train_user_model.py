@@ -2,6 +2,11 @@
 
 import os
 import json
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
 import joblib
 
 import pandas as pd
@@ -9,7 +14,7 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.ensemble import IsolationForest, RandomForestClassifier
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from models import HealthData
+from services.feature_store import count_resting_windows, load_resting_windows
 
 
 
@@ -26,6 +31,10 @@ RETRAIN_MIN_NEW_WINDOWS = 50      # retrain if >= 50 new 5-min windows
 RETRAIN_COOLDOWN_HOURS = 12       # don't retrain more often than every 12 hours
 MIN_WINDOWS_TO_TRAIN = 10         # don't train at all unless baseline >= 10 windows
 
+TRAINING_PROCESSES = int(os.getenv("TRAINING_PROCESSES", "1"))
+
+_training_pool = None
+
 
 def _user_folder(user_id: int) -> str:
     return os.path.join(BASE_PATH, f"user_{user_id}")
@@ -56,95 +65,111 @@ def _hours_since(iso_ts: str) -> float:
     
     
 async def get_current_window_count(user_id: int, db: AsyncSession) -> int:
-    df = await fetch_user_data(user_id, db)  
-    return int(len(df)) if df is not None else 0
+    return await count_resting_windows(db, user_id)
 
-async def should_retrain_user_model(user_id: int, db: AsyncSession) -> bool:
+async def get_retrain_eligibility(user_id: int, db: AsyncSession) -> dict:
+    """
+    Retrain decision plus the numbers behind it. Window counts come from a
+    COUNT over resting_windows, so no health rows are loaded.
+    """
     current_windows = await get_current_window_count(user_id, db)
-    if current_windows < MIN_WINDOWS_TO_TRAIN:
-        # Not enough baseline to train at all
-        return False
 
     meta = _load_metadata(user_id)
     last_trained = meta.get("last_trained")
     prev_windows = int(meta.get("n_windows", 0))
+    new_windows = max(0, current_windows - prev_windows)
+
+    cooldown_remaining = 0.0
+    if last_trained:
+        cooldown_remaining = max(0.0, RETRAIN_COOLDOWN_HOURS - _hours_since(last_trained))
+
+    if current_windows < MIN_WINDOWS_TO_TRAIN:
+        # Not enough baseline to train at all
+        eligible, reason = False, "insufficient_baseline"
+    elif cooldown_remaining > 0:
+        eligible, reason = False, "cooldown"
+    elif new_windows < RETRAIN_MIN_NEW_WINDOWS:
+        eligible, reason = False, "not_enough_new_data"
+    else:
+        eligible, reason = True, "ready"
+
+    return {
+        "eligible": eligible,
+        "reason": reason,
+        "current_windows": current_windows,
+        "trained_windows": prev_windows,
+        "new_windows": new_windows,
+        "min_new_windows": RETRAIN_MIN_NEW_WINDOWS,
+        "last_trained": last_trained,
+        "cooldown_remaining_hours": round(cooldown_remaining, 2),
+    }
 
-    # Cooldown check
-    if last_trained and _hours_since(last_trained) < RETRAIN_COOLDOWN_HOURS:
-        return False
 
-    # New data threshold
-    new_windows = current_windows - prev_windows
-    return new_windows >= RETRAIN_MIN_NEW_WINDOWS
+async def should_retrain_user_model(user_id: int, db: AsyncSession) -> bool:
+    eligibility = await get_retrain_eligibility(user_id, db)
+    return eligibility["eligible"]
 
 
 
 async def fetch_user_data(user_id: int, db: AsyncSession):
     """
-    Fetch resting health data and aggregate into 5-minute windows.
+    Resting health data aggregated into 5-minute windows, read from the
+    resting_windows feature table.
     """
-    result = await db.execute(
-        select(HealthData)
-        .where(
-            HealthData.user_id == user_id,
-            HealthData.activity_type == "resting",
-            HealthData.metric_type.in_(["heart_rate", "spo2", "blood_pressure"])
+    return await load_resting_windows(db, user_id)
+
+
+
+def _get_training_pool() -> ProcessPoolExecutor:
+    global _training_pool
+    if _training_pool is None:
+        # spawn: never fork a process that is running an event loop + DB pool
+        _training_pool = ProcessPoolExecutor(
+            max_workers=TRAINING_PROCESSES,
+            mp_context=multiprocessing.get_context("spawn"),
         )
-    )
-    records = result.scalars().all()
-
-    if not records:
-        return pd.DataFrame()
-
-    rows = []
-    for r in records:
-        rows.append({
-            "timestamp": r.timestamp,
-            "heart_rate": r.value if r.metric_type == "heart_rate" else None,
-            "spo2": r.value if r.metric_type == "spo2" else None,
-            "systolic_bp": r.systolic if r.metric_type == "blood_pressure" else None,
-            "diastolic_bp": r.diastolic if r.metric_type == "blood_pressure" else None,
-        })
-
-    df = pd.DataFrame(rows)
-    df["timestamp"] = pd.to_datetime(df["timestamp"])
-    df.set_index("timestamp", inplace=True)
-
-    # 5-minute window aggregation
-    windowed = df.resample("5min").agg({
-        "heart_rate": "mean",
-        "spo2": "min",
-        "systolic_bp": "max",
-        "diastolic_bp": "max"
-    })
-
-    windowed.dropna(inplace=True)
-    return windowed
-
-
-
-async def train_user_model(user_id: int, db: AsyncSession):
-    """Train personalized unsupervised and supervised models for a user."""
-    df = await fetch_user_data(user_id, db)
-    if df.empty or len(df) < MIN_WINDOWS_TO_TRAIN:
-        print(f" Not enough baseline windows to train user {user_id}. windows={len(df)}")
-        return
+    return _training_pool
 
-    print("TRAIN DEBUG")
-    print("CWD:", os.getcwd())
-    print("BASE_PATH:", os.path.abspath(BASE_PATH))
-    print("user_id:", user_id)
-    print("windows:", len(df))
-    print("df.head():", df.head())
 
-    if df.empty:
-        print(f"No resting data for user {user_id}. Skipping training.")
-        return
-    if len(df) < 3:
-        print(f"Not enough windows to train for user {user_id}: {len(df)}")
-        return
+def shutdown_training_pool():
+    global _training_pool
+    if _training_pool is not None:
+        _training_pool.shutdown(wait=False, cancel_futures=True)
+        _training_pool = None
+
+
+def _discard_training_pool(pool: ProcessPoolExecutor):
+    # A worker died (OOM kill, segfault): the executor stays broken for good,
+    # so drop it and let the next job spawn a fresh one. Another job may
+    # already have replaced it; leave that one alone.
+    global _training_pool
+    if _training_pool is pool:
+        _training_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _atomic_dump(obj, path: str):
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    joblib.dump(obj, tmp_path)
+    os.replace(tmp_path, path)
+
 
+def _atomic_write_json(data: dict, path: str):
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=4)
+    os.replace(tmp_path, path)
 
+
+def fit_and_save_user_model(user_id: int, df: pd.DataFrame) -> dict:
+    """
+    CPU-bound half of training: fit scaler + models and write the artifacts.
+    Runs in a worker process. Every file is written to a temp name and
+    os.replace()d into place, so readers never see a partially written file.
+    metadata.json is marked "writing_since" before the first artifact is
+    replaced and rewritten last; readers that saw it change (or marked)
+    while loading retry, so a new model is never paired with an old scaler.
+    """
     # 1️ Scale
     scaler = StandardScaler()
     X_scaled = scaler.fit_transform(df)
@@ -168,13 +193,15 @@ async def train_user_model(user_id: int, db: AsyncSession):
     sup_model.fit(X_sup, y_sup)
 
     # 4️ Create user folder
-    user_folder = os.path.join(BASE_PATH, f"user_{user_id}")
+    user_folder = _user_folder(user_id)
     os.makedirs(user_folder, exist_ok=True)
 
     # 5️ Save models & scaler
-    joblib.dump(iso_model, os.path.join(user_folder, "unsupervised_model.pkl"))
-    joblib.dump(sup_model, os.path.join(user_folder, "supervised_model.pkl"))
-    joblib.dump(scaler, os.path.join(user_folder, "scaler.pkl"))
+    pending = {**_load_metadata(user_id), "writing_since": datetime.now(timezone.utc).isoformat()}
+    _atomic_write_json(pending, _metadata_path(user_id))
+    _atomic_dump(iso_model, os.path.join(user_folder, "unsupervised_model.pkl"))
+    _atomic_dump(sup_model, os.path.join(user_folder, "supervised_model.pkl"))
+    _atomic_dump(scaler, os.path.join(user_folder, "scaler.pkl"))
 
     # 6️ Save metadata
     metadata = {
@@ -183,8 +210,39 @@ async def train_user_model(user_id: int, db: AsyncSession):
         "metrics": ["heart_rate", "spo2", "systolic_bp", "diastolic_bp"],
         "model_version": "v2_windowed",
     }
+    _atomic_write_json(metadata, _metadata_path(user_id))
+
+    return metadata
+
+
+async def train_user_model(user_id: int, session_factory):
+    """
+    Train personalized unsupervised and supervised models for a user.
+    Data is loaded here on a session from session_factory, closed before
+    fitting so a long fit doesn't hold a pooled connection; fitting and
+    saving run in the training process pool so the event loop stays free.
+    Returns the new metadata, or None if skipped.
+    """
+    async with session_factory() as db:
+        df = await fetch_user_data(user_id, db)
+    if df.empty or len(df) < MIN_WINDOWS_TO_TRAIN:
+        print(f" Not enough baseline windows to train user {user_id}. windows={len(df)}")
+        return None
+
+    print("TRAIN DEBUG")
+    print("CWD:", os.getcwd())
+    print("BASE_PATH:", os.path.abspath(BASE_PATH))
+    print("user_id:", user_id)
+    print("windows:", len(df))
+    print("df.head():", df.head())
 
-    with open(os.path.join(user_folder, "metadata.json"), "w") as f:
-        json.dump(metadata, f, indent=4)
+    loop = asyncio.get_running_loop()
+    pool = _get_training_pool()
+    try:
+        metadata = await loop.run_in_executor(pool, fit_and_save_user_model, user_id, df)
+    except BrokenProcessPool:
+        _discard_training_pool(pool)
+        raise
 
     print(f" Trained models saved for user {user_id}")
+    return metadata
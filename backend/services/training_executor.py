@@ -0,0 +1,76 @@
+# backend/services/training_executor.py
+
+import asyncio
+from datetime import datetime
+
+from database import async_session
+from services.train_user_model import train_user_model, shutdown_training_pool, TRAINING_PROCESSES
+
+
+class TrainingExecutor:
+    """
+    Per-user training job queue in front of the training process pool.
+
+    At most one job per user is queued or running at a time; submitting
+    again returns the existing job. Jobs open their own DB session (only
+    while loading data), so callers never block on training.
+    """
+
+    def __init__(self, concurrency: int = TRAINING_PROCESSES):
+        self._slots = asyncio.Semaphore(max(1, concurrency))
+        self._jobs = {}    # user id -> job status dict
+        self._tasks = {}   # user id -> asyncio.Task
+
+    def submit(self, user_id: int) -> dict:
+        job = self._jobs.get(user_id)
+        if job and job["status"] in ("queued", "running"):
+            return job
+
+        job = {
+            "user_id": user_id,
+            "status": "queued",
+            "submitted_at": datetime.utcnow().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+            "error": None,
+            "metadata": None,
+        }
+        self._jobs[user_id] = job
+        self._tasks[user_id] = asyncio.create_task(self._run(job))
+        return job
+
+    async def wait(self, user_id: int) -> dict:
+        task = self._tasks.get(user_id)
+        if task:
+            await asyncio.shield(task)
+        return self._jobs.get(user_id)
+
+    def status(self, user_id: int) -> dict:
+        return self._jobs.get(user_id)
+
+    async def _run(self, job: dict):
+        user_id = job["user_id"]
+        async with self._slots:
+            job["status"] = "running"
+            job["started_at"] = datetime.utcnow().isoformat()
+            try:
+                metadata = await train_user_model(user_id, async_session)
+                job["metadata"] = metadata
+                job["status"] = "done" if metadata else "skipped"
+            except Exception as e:
+                job["status"] = "failed"
+                job["error"] = str(e)
+                print(f" Training failed for user {user_id}: {e}")
+            finally:
+                job["finished_at"] = datetime.utcnow().isoformat()
+                self._tasks.pop(user_id, None)
+
+    async def shutdown(self):
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        shutdown_training_pool()
+
+
+training_executor = TrainingExecutor()
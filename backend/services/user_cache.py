@@ -0,0 +1,118 @@
+# backend/services/user_cache.py
+
+import os
+import time
+from collections import OrderedDict
+
+from fastapi import Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from database import get_db
+from models import User
+
+
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "1024"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "300"))
+
+# Everything read endpoints need; password and Google tokens stay in the DB.
+PROFILE_FIELDS = (
+    "id",
+    "name",
+    "email",
+    "profile_pic",
+    "age",
+    "gender",
+    "phone",
+    "country",
+    "role",
+    "last_fit_sync_at",
+)
+
+
+class CachedUser:
+    """Read-only snapshot of a User row, with the same attribute names."""
+
+    __slots__ = PROFILE_FIELDS
+
+    def __init__(self, user: User):
+        for field in PROFILE_FIELDS:
+            setattr(self, field, getattr(user, field))
+
+    def profile(self) -> dict:
+        return {field: getattr(self, field) for field in PROFILE_FIELDS}
+
+
+class UserCache:
+    """
+    email -> CachedUser, LRU-bounded with a TTL. Anything that changes a
+    user row (profile update, OAuth callback, sync) calls invalidate(); the
+    TTL only bounds how long a change made by another process can go unseen.
+    Unknown emails are not cached, so a new sign-up is visible immediately.
+    """
+
+    def __init__(self, max_entries: int = USER_CACHE_MAX_ENTRIES, ttl_seconds: float = USER_CACHE_TTL_SECONDS):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl_seconds
+        self._entries = OrderedDict()   # email -> (CachedUser, expires_at)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, email: str):
+        entry = self._entries.get(email)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            del self._entries[email]
+            return None
+        self._entries.move_to_end(email)
+        return entry[0]
+
+    def put(self, user: User) -> CachedUser:
+        cached = CachedUser(user)
+        self._entries[cached.email] = (cached, time.monotonic() + self.ttl)
+        self._entries.move_to_end(cached.email)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return cached
+
+    def invalidate(self, email: str = None, user_id: int = None):
+        if email is not None:
+            self._entries.pop(email, None)
+        if user_id is not None:
+            for key in [k for k, (cached, _) in self._entries.items() if cached.id == user_id]:
+                del self._entries[key]
+
+    async def lookup(self, email: str, db: AsyncSession):
+        cached = self.get(email)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        result = await db.execute(select(User).where(User.email == email))
+        user = result.scalars().first()
+        return self.put(user) if user else None
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+user_cache = UserCache()
+
+
+async def _require_user(email: str, db: AsyncSession) -> CachedUser:
+    user = await user_cache.lookup(email, db)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+
+async def get_user_by_user_email(user_email: str, db: AsyncSession = Depends(get_db)) -> CachedUser:
+    """Dependency for endpoints taking ?user_email=."""
+    return await _require_user(user_email, db)
+
+
+async def get_user_by_email(email: str, db: AsyncSession = Depends(get_db)) -> CachedUser:
+    """Dependency for endpoints taking ?email=."""
+    return await _require_user(email, db)
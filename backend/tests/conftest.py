@@ -0,0 +1,10 @@
+# backend/tests/conftest.py
+
+import os
+import sys
+
+# database.py refuses to import without a URL; tests that touch the DB build
+# their own in-memory engines.
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -0,0 +1,77 @@
+# backend/tests/test_activity_index.py
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from utils.activity_index import ActivityIntervalIndex
+
+
+def _seg(start, end, activity):
+    return {"start": start, "end": end, "activity": activity}
+
+
+T0 = datetime(2024, 3, 1, 6, 0, 0)
+
+
+def _labels(index, timestamps):
+    return list(index.label_array(np.array(timestamps, dtype="datetime64[ns]")))
+
+
+def test_label_array_matches_lookup():
+    segments = [
+        _seg(T0, T0 + timedelta(minutes=30), "walking"),
+        _seg(T0 + timedelta(hours=1), T0 + timedelta(hours=2), "running"),
+        _seg(T0 + timedelta(minutes=90), T0 + timedelta(hours=3), "cycling"),  # overlaps running
+    ]
+    index = ActivityIntervalIndex(segments)
+    timestamps = [T0 + timedelta(minutes=m) for m in range(-10, 200, 7)]
+
+    assert _labels(index, timestamps) == [index.lookup(ts) for ts in timestamps]
+
+
+def test_label_array_closed_interval_bounds():
+    index = ActivityIntervalIndex([_seg(T0, T0 + timedelta(minutes=5), "walking")])
+    timestamps = [
+        T0 - timedelta(seconds=1),
+        T0,
+        T0 + timedelta(minutes=5),
+        T0 + timedelta(minutes=5, seconds=1),
+    ]
+
+    assert _labels(index, timestamps) == ["resting", "walking", "walking", "resting"]
+
+
+def test_label_array_first_listed_segment_wins_overlaps():
+    segments = [
+        _seg(T0 + timedelta(minutes=10), T0 + timedelta(minutes=20), "running"),
+        _seg(T0, T0 + timedelta(minutes=30), "walking"),
+    ]
+    index = ActivityIntervalIndex(segments)
+    timestamps = [T0 + timedelta(minutes=m) for m in (5, 10, 15, 20, 25)]
+
+    assert _labels(index, timestamps) == ["walking", "running", "running", "running", "walking"]
+
+
+def test_label_array_truncates_sub_second_timestamps():
+    index = ActivityIntervalIndex([_seg(T0, T0 + timedelta(seconds=10), "walking")])
+    timestamps = np.array(
+        ["2024-03-01T06:00:10.900", "2024-03-01T06:00:11.000"], dtype="datetime64[ms]"
+    )
+
+    assert list(index.label_array(timestamps)) == ["walking", "resting"]
+
+
+def test_label_array_empty_index_and_input():
+    empty = ActivityIntervalIndex([], default="unknown")
+    assert _labels(empty, [T0, T0 + timedelta(hours=1)]) == ["unknown", "unknown"]
+
+    index = ActivityIntervalIndex([_seg(T0, T0 + timedelta(minutes=5), "walking")])
+    assert index.label_array(np.array([], dtype="datetime64[ns]")).shape == (0,)
+
+
+def test_segments_ending_before_they_start_are_ignored():
+    index = ActivityIntervalIndex([_seg(T0 + timedelta(minutes=5), T0, "walking")])
+
+    assert len(index) == 0
+    assert _labels(index, [T0 + timedelta(minutes=2)]) == ["resting"]
@@ -0,0 +1,172 @@
+# backend/tests/test_fit_request_planner.py
+
+import asyncio
+from datetime import datetime, timedelta
+
+from routers.google_auth import DATA_TYPES
+from services.fit_request_planner import (
+    DAY_MS,
+    HOUR_MS,
+    _millis,
+    _split_buckets,
+    fetch_planned,
+    plan_requests,
+)
+
+
+D0 = datetime(2024, 3, 1)
+AGGREGATE_URL = "https://fit.test/aggregate"
+SESSIONS_URL = "https://fit.test/sessions"
+
+
+def _day(n: int) -> datetime:
+    return D0 + timedelta(days=n)
+
+
+def _aggregates(plans):
+    return [p for p in plans if p["kind"] == "aggregate"]
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, payload: dict = None):
+        self.status_code = status_code
+        self._payload = payload or {}
+
+    def json(self):
+        return self._payload
+
+
+class FakeFit:
+    """
+    Answers aggregate calls with one point per requested type per day (in
+    the day's first bucket); calls including a `reject` type fail with
+    `status`.
+    """
+
+    def __init__(self, reject=(), status: int = 400):
+        self.reject = set(reject)
+        self.status = status
+        self.calls = []
+
+    async def send(self, method, url, json=None, params=None):
+        if url == SESSIONS_URL:
+            self.calls.append(("sessions", params))
+            return FakeResponse(200, {"session": [], "hasMoreData": False})
+
+        data_types = [entry["dataTypeName"] for entry in json["aggregateBy"]]
+        self.calls.append(("aggregate", data_types))
+        if self.reject & set(data_types):
+            return FakeResponse(self.status)
+
+        buckets = []
+        for t in range(json["startTimeMillis"], json["endTimeMillis"], DAY_MS):
+            buckets.append({
+                "startTimeMillis": str(t),
+                "dataset": [{"point": [{"dataTypeName": dt, "startTimeMillis": str(t)}]} for dt in data_types],
+            })
+        return FakeResponse(200, {"bucket": buckets})
+
+
+def _fetch(fake, plans, day_windows, rejected=None):
+    return asyncio.run(fetch_planned(fake.send, plans, day_windows, AGGREGATE_URL, SESSIONS_URL, rejected=rejected))
+
+
+def test_plan_packs_types_sharing_a_start_day_into_day_chunks():
+    starts = {"heart_rate": _day(0), "spo2": _day(0), "steps": _day(0)}
+    plans = _aggregates(plan_requests(starts, _day(25), max_days=10))
+
+    assert [(p["start"], p["end"]) for p in plans] == [(_day(0), _day(10)), (_day(10), _day(20)), (_day(20), _day(25))]
+    assert all(p["keys"] == ["heart_rate", "spo2", "steps"] for p in plans)
+
+
+def test_plan_splits_groups_by_start_day_and_max_types():
+    starts = {key: _day(0) for key in DATA_TYPES}
+    starts["stress"] = _day(3)
+    plans = _aggregates(plan_requests(starts, _day(5), max_days=10, max_types=3))
+
+    keys = [(p["keys"], p["start"]) for p in plans]
+    assert keys == [
+        (["heart_rate", "blood_pressure", "spo2"], _day(0)),
+        (["steps", "distance", "calories"], _day(0)),
+        (["sleep"], _day(0)),
+        (["stress"], _day(3)),
+    ]
+
+
+def test_plan_requests_solo_keys_on_their_own():
+    starts = {"heart_rate": _day(0), "spo2": _day(0), "stress": _day(0)}
+    plans = _aggregates(plan_requests(starts, _day(2), solo_keys={"spo2"}))
+
+    assert [p["keys"] for p in plans] == [["heart_rate", "stress"], ["spo2"]]
+
+
+def test_plan_fetches_activity_from_earliest_metric_and_sessions_separately():
+    starts = {"heart_rate": _day(2), "activity": _day(4), "sessions": _day(3)}
+    plans = plan_requests(starts, _day(6), max_days=10)
+
+    activity = [p for p in plans if p["kind"] == "activity"]
+    sessions = [p for p in plans if p["kind"] == "sessions"]
+    assert [(p["start"], p["end"]) for p in activity] == [(_day(2), _day(6))]
+    assert [(p["start"], p["end"]) for p in sessions] == [(_day(3), _day(6))]
+
+
+def test_split_buckets_by_day_and_request_order():
+    start = _day(0)
+    payload = {"bucket": [
+        {"startTimeMillis": str(_millis(start) + HOUR_MS * 23), "dataset": [{"point": ["a1"]}, {"point": []}]},
+        {"startTimeMillis": str(_millis(start) + DAY_MS), "dataset": [{"point": ["a2"]}, {"point": ["b2"]}]},
+        {"startTimeMillis": str(_millis(start) + DAY_MS + HOUR_MS), "dataset": [{"point": ["a3"]}, {"point": ["b3"]}]},
+    ]}
+
+    assert _split_buckets(payload, 2, start) == [{0: ["a1"], 1: ["a2", "a3"]}, {1: ["b2", "b3"]}]
+
+
+def test_fetch_planned_returns_one_entry_per_day():
+    starts = {"heart_rate": _day(0), "spo2": _day(1)}
+    day_windows = [(_day(n), _day(n + 1)) for n in range(3)]
+    fake = FakeFit()
+    days = _fetch(fake, _aggregates(plan_requests(starts, _day(3))), day_windows)
+
+    assert [d["start_time"] for d in days] == [_day(0), _day(1), _day(2)]
+    assert days[0]["streams"] == {"heart_rate"}
+    assert days[1]["streams"] == {"heart_rate", "spo2"}
+    assert days[2]["status"] == {"heart_rate": 200, "spo2": 200}
+    assert days[2]["points"]["spo2"] == [{"dataTypeName": DATA_TYPES["spo2"], "startTimeMillis": str(_millis(_day(2)))}]
+
+
+def test_rejected_type_splits_packed_call_and_is_reported():
+    starts = {"heart_rate": _day(0), "spo2": _day(0), "stress": _day(0)}
+    day_windows = [(_day(0), _day(1))]
+    fake = FakeFit(reject={DATA_TYPES["stress"]})
+    rejected = set()
+    days = _fetch(fake, _aggregates(plan_requests(starts, _day(1))), day_windows, rejected)
+
+    # One packed call, then one per type
+    assert len(fake.calls) == 4
+    assert rejected == {"stress"}
+    assert days[0]["status"] == {"heart_rate": 200, "spo2": 200, "stress": 400}
+    assert days[0]["points"]["stress"] == []
+    assert len(days[0]["points"]["heart_rate"]) == 1
+
+
+def test_auth_failures_fail_the_chunk_once():
+    starts = {"heart_rate": _day(0), "spo2": _day(0), "stress": _day(0)}
+    day_windows = [(_day(0), _day(1))]
+    for status in (401, 403):
+        fake = FakeFit(reject=set(DATA_TYPES.values()), status=status)
+        rejected = set()
+        days = _fetch(fake, _aggregates(plan_requests(starts, _day(1))), day_windows, rejected)
+
+        assert len(fake.calls) == 1
+        assert rejected == set()
+        assert days[0]["status"] == {"heart_rate": status, "spo2": status, "stress": status}
+
+
+def test_missing_response_is_reported_as_none():
+    async def send(method, url, json=None, params=None):
+        return None
+
+    plans = _aggregates(plan_requests({"heart_rate": _day(0), "spo2": _day(0)}, _day(1)))
+    days = asyncio.run(fetch_planned(send, plans, [(_day(0), _day(1))], AGGREGATE_URL, SESSIONS_URL))
+
+    assert days[0]["status"] == {"heart_rate": None, "spo2": None}
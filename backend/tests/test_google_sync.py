@@ -0,0 +1,121 @@
+# backend/tests/test_google_sync.py
+
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.future import select
+
+import services.google_sync as google_sync
+from models import Base, HealthData, SyncCheckpoint, User
+from routers.google_auth import DATA_TYPES
+from services.response_cache import MemoryBackend, ResponseCache
+
+
+HOUR_NS = 3_600_000_000_000
+
+
+def _fit_handler(calls: list):
+    """Google Fit stand-in: one heart-rate point per aggregate bucket, no sessions."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append((request.method, request.url.path))
+        if request.method == "GET":
+            return httpx.Response(200, json={"session": [], "hasMoreData": False})
+
+        body = json.loads(request.content)
+        data_types = [entry["dataTypeName"] for entry in body["aggregateBy"]]
+        step = body["bucketByTime"]["durationMillis"]
+        buckets = []
+        for start_ms in range(body["startTimeMillis"], body["endTimeMillis"], step):
+            datasets = []
+            for data_type in data_types:
+                points = []
+                if data_type == DATA_TYPES["heart_rate"] and start_ms % (6 * 3_600_000) == 0:
+                    points.append({
+                        "startTimeNanos": str(start_ms * 1_000_000),
+                        "endTimeNanos": str(start_ms * 1_000_000 + HOUR_NS),
+                        "value": [{"fpVal": 72.0}],
+                    })
+                datasets.append({"point": points})
+            buckets.append({"startTimeMillis": str(start_ms), "dataset": datasets})
+        return httpx.Response(200, json={"bucket": buckets})
+
+    return handler
+
+
+def _run_sync(tmp_path, monkeypatch, days_back: int = 2):
+    queued = []
+    monkeypatch.setattr(google_sync.training_executor, "submit", queued.append)
+    calls = []
+
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'sync.db'}")
+        client = httpx.AsyncClient(transport=httpx.MockTransport(_fit_handler(calls)))
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            async with AsyncSession(engine, expire_on_commit=False) as db:
+                user = User(
+                    name="Sync Test",
+                    email="sync@example.com",
+                    access_token="token",
+                    refresh_token="refresh",
+                    token_expires_at=datetime.utcnow() + timedelta(hours=1),
+                )
+                db.add(user)
+                await db.commit()
+
+                result = await google_sync.sync_google_fit_data(user, db, days_back=days_back, client=client)
+
+            async with AsyncSession(engine) as db:
+                stored_user = (await db.execute(select(User))).scalars().one()
+                checkpoints = (await db.execute(select(SyncCheckpoint))).scalars().all()
+                rows = (await db.execute(select(HealthData))).scalars().all()
+                return result, stored_user, checkpoints, rows
+        finally:
+            await client.aclose()
+            await engine.dispose()
+
+    return asyncio.run(main()), calls, queued
+
+
+def test_sync_commits_rows_and_datetime_watermarks(tmp_path, monkeypatch):
+    (result, user, checkpoints, rows), calls, _ = _run_sync(tmp_path, monkeypatch)
+
+    assert calls
+    assert result["failed_metrics"] == {}
+    assert result["added_rows"] == len(rows) > 0
+    assert {row.metric_type for row in rows} == {"heart_rate"}
+
+    assert isinstance(user.last_fit_sync_at, datetime)
+    streams = {cp.metric_type: cp for cp in checkpoints}
+    for stream in google_sync.SYNC_STREAMS:
+        assert isinstance(streams[stream].synced_through, datetime)
+        assert isinstance(streams[stream].updated_at, datetime)
+        assert streams[stream].synced_through == user.last_fit_sync_at
+        assert streams[stream].last_error is None
+
+
+def test_first_seeding_sync_drops_cached_past_days(tmp_path, monkeypatch):
+    cache = ResponseCache(MemoryBackend())
+    monkeypatch.setattr(google_sync, "response_cache", cache)
+    long_ago = datetime.utcnow() - timedelta(days=60)
+
+    async def cached_anomaly(status: str):
+        # A fresh database's first user is id 1
+        response = await cache.get_or_compute(1, ("personal_anomaly", "past-day"), long_ago, lambda: _result(status))
+        return json.loads(response.body)["status"]
+
+    async def _result(status: str):
+        return {"status": status}
+
+    assert asyncio.run(cached_anomaly("no_data")) == "no_data"
+    assert asyncio.run(cached_anomaly("ok")) == "no_data"
+
+    # The sync only adds recent rows, but seeds windows for all of history
+    _run_sync(tmp_path, monkeypatch)
+
+    assert asyncio.run(cached_anomaly("ok")) == "ok"
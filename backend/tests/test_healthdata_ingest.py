@@ -0,0 +1,112 @@
+# backend/tests/test_healthdata_ingest.py
+
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.future import select
+
+from models import Base, HealthData
+from services.healthdata_ingest import HealthDataBatch
+
+
+T0 = datetime(2024, 3, 1, 6, 0, 0)
+
+
+def _run_with_session(tmp_path, scenario):
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'ingest.db'}")
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            async with AsyncSession(engine) as db:
+                return await scenario(db)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+
+async def _count(db) -> int:
+    return (await db.execute(select(func.count()).select_from(HealthData))).scalar()
+
+
+def _fill(batch: HealthDataBatch, n: int):
+    for i in range(n):
+        batch.add("heart_rate", T0 + timedelta(minutes=i), value=60 + i, activity_type="resting")
+
+
+def test_flush_twice_inserts_once(tmp_path):
+    async def scenario(db):
+        first = HealthDataBatch(user_id=1)
+        _fill(first, 5)
+        inserted_first = await first.flush(db)
+
+        # Same points again, as a re-sync of an overlapping day would add them
+        second = HealthDataBatch(user_id=1)
+        _fill(second, 5)
+        inserted_second = await second.flush(db)
+        await db.commit()
+        return inserted_first, inserted_second, await _count(db)
+
+    assert _run_with_session(tmp_path, scenario) == (5, 0, 5)
+
+
+def test_flush_clears_buffer(tmp_path):
+    async def scenario(db):
+        batch = HealthDataBatch(user_id=1)
+        _fill(batch, 3)
+        inserted = await batch.flush(db)
+        length_after = len(batch)
+        inserted_again = await batch.flush(db)
+
+        # Keys are forgotten too, so the same point can be buffered again
+        _fill(batch, 1)
+        length_refilled = len(batch)
+        await db.commit()
+        return inserted, length_after, inserted_again, length_refilled, await _count(db)
+
+    assert _run_with_session(tmp_path, scenario) == (3, 0, 0, 1, 3)
+
+
+def test_duplicates_within_a_batch_are_dropped(tmp_path):
+    async def scenario(db):
+        batch = HealthDataBatch(user_id=1)
+        batch.add("spo2", T0, value=97)
+        batch.add("spo2", T0, value=98)
+        batch.add("heart_rate", T0, value=70)  # same time, other metric
+        buffered = len(batch)
+        inserted = await batch.flush(db)
+        await db.commit()
+        values = (await db.execute(select(HealthData.value).where(HealthData.metric_type == "spo2"))).scalars().all()
+        return buffered, inserted, values
+
+    assert _run_with_session(tmp_path, scenario) == (2, 2, [97])
+
+
+def test_flush_in_chunks_counts_only_new_rows(tmp_path):
+    async def scenario(db):
+        existing = HealthDataBatch(user_id=1)
+        _fill(existing, 4)
+        await existing.flush(db)
+
+        batch = HealthDataBatch(user_id=1, batch_size=3)
+        _fill(batch, 10)  # 4 already stored, 6 new, written 3 rows at a time
+        inserted = await batch.flush(db)
+        await db.commit()
+        return inserted, await _count(db)
+
+    assert _run_with_session(tmp_path, scenario) == (6, 10)
+
+
+def test_same_points_for_another_user_are_kept(tmp_path):
+    async def scenario(db):
+        for user_id in (1, 2):
+            batch = HealthDataBatch(user_id=user_id)
+            _fill(batch, 2)
+            await batch.flush(db)
+        await db.commit()
+        return await _count(db)
+
+    assert _run_with_session(tmp_path, scenario) == 4
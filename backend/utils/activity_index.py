@@ -0,0 +1,86 @@
+# utils/activity_index.py
+
+import bisect
+from datetime import datetime
+
+import numpy as np
+
+
+DEFAULT_ACTIVITY = "resting"
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _to_seconds(dt: datetime) -> int:
+    return int((dt - _EPOCH).total_seconds())
+
+
+class ActivityIntervalIndex:
+    """
+    Sorted, non-overlapping view of Google Fit activity segments.
+
+    Segments are closed [start, end] UTC-naive intervals. Where two segments
+    overlap, the one listed first wins, which is what the old linear scan did.
+    Lookups are a binary search over the segment starts.
+    """
+
+    def __init__(self, segments: list, default: str = DEFAULT_ACTIVITY):
+        self.default = default
+        self._starts, self._ends, self._labels = self._flatten(segments)
+
+        self._starts_np = np.asarray(self._starts, dtype=np.int64)
+        self._ends_np = np.asarray(self._ends, dtype=np.int64)
+        # Trailing slot holds the default label for misses
+        self._labels_np = np.asarray(self._labels + [default], dtype=object)
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    @staticmethod
+    def _flatten(segments: list):
+        # Whole-second closed intervals -> half-open [start, end + 1)
+        spans = [
+            (_to_seconds(seg["start"]), _to_seconds(seg["end"]) + 1, seg["activity"])
+            for seg in segments
+            if seg["end"] >= seg["start"]
+        ]
+        if not spans:
+            return [], [], []
+
+        ordered = sorted(spans, key=lambda s: s[0])
+        if all(prev[1] <= cur[0] for prev, cur in zip(ordered, ordered[1:])):
+            return [s[0] for s in ordered], [s[1] for s in ordered], [s[2] for s in ordered]
+
+        # Overlaps: split at every boundary and keep the first listed segment
+        # covering each elementary piece.
+        bounds = sorted({b for s, e, _ in spans for b in (s, e)})
+        starts, ends, labels = [], [], []
+        for lo, hi in zip(bounds, bounds[1:]):
+            label = next((a for s, e, a in spans if s <= lo and hi <= e), None)
+            if label is None:
+                continue
+            if labels and ends[-1] == lo and labels[-1] == label:
+                ends[-1] = hi
+                continue
+            starts.append(lo)
+            ends.append(hi)
+            labels.append(label)
+        return starts, ends, labels
+
+    def lookup(self, ts: datetime) -> str:
+        t = _to_seconds(ts)
+        i = bisect.bisect_right(self._starts, t) - 1
+        if i >= 0 and t < self._ends[i]:
+            return self._labels[i]
+        return self.default
+
+    def label_array(self, timestamps) -> np.ndarray:
+        """Label an array of datetime64 (any unit) timestamps in one pass."""
+        t = np.asarray(timestamps).astype("datetime64[s]").astype(np.int64)
+        if not len(self._starts):
+            return np.full(t.shape, self.default, dtype=object)
+
+        idx = np.searchsorted(self._starts_np, t, side="right") - 1
+        safe_idx = np.clip(idx, 0, None)
+        hit = (idx >= 0) & (t < self._ends_np[safe_idx])
+        return self._labels_np[np.where(hit, safe_idx, len(self._starts))]
@@ -0,0 +1,25 @@
+# backend/utils/columnar.py
+
+import numpy as np
+
+
+def delta_encode(timestamps_ms) -> np.ndarray:
+    """
+    Sorted epoch-ms timestamps -> [first, t1 - t0, t2 - t1, ...].
+    Clients decode with a running sum.
+    """
+    ts = np.asarray(timestamps_ms, dtype=np.int64)
+    if ts.size == 0:
+        return ts
+    return np.concatenate((ts[:1], np.diff(ts)))
+
+
+def points_to_columns(points: list, fields) -> dict:
+    """
+    [{"timestamp": ms, "value": v, ...}, ...] -> {"timestamps": delta-encoded,
+    "values": [...], ...}, one array per name in fields.
+    """
+    columns = {"timestamps": delta_encode([p["timestamp"] for p in points])}
+    for field in fields:
+        columns["values" if field == "value" else field] = [p[field] for p in points]
+    return columns
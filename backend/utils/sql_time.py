@@ -0,0 +1,15 @@
+# utils/sql_time.py
+
+from sqlalchemy import Integer, cast, extract, func
+
+
+def epoch_seconds(column, dialect_name: str):
+    """Whole seconds since 1970-01-01 for a UTC-naive DateTime column."""
+    if dialect_name == "postgresql":
+        return cast(extract("epoch", column), Integer)
+    return cast(func.strftime("%s", column), Integer)
+
+
+def bucket_index(column, dialect_name: str, origin_epoch: int, width_seconds: int):
+    """Zero-based bucket number of `column` in fixed-width buckets starting at origin_epoch."""
+    return (epoch_seconds(column, dialect_name) - origin_epoch) // width_seconds